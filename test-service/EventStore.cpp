@@ -0,0 +1,197 @@
+#include "EventStore.hpp"
+
+#include <algorithm>
+
+uint64_t EventStore::add(const Event &added) {
+  uint64_t seq;
+  {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    seq = m_firstSeq + m_events.size();
+    m_events.push_back(added);
+    m_events.back().seq = seq;
+
+    const Event &event = m_events.back();
+    for (size_t i = 0; i < event.changes.size(); ++i) {
+      const Change &change = event.changes[i];
+      m_byOperation[change.operation].emplace_back(seq, i);
+      if (change.hasOld) {
+        m_byPath.emplace(change.oldPath, ChangeRef(seq, i));
+      }
+      if (change.hasNew && (!change.hasOld || change.newPath != change.oldPath)) {
+        m_byPath.emplace(change.newPath, ChangeRef(seq, i));
+      }
+    }
+    m_changes += event.changes.size();
+    // the newest event is kept even if it alone exceeds the limit
+    while (m_changes > m_limit && m_events.size() > 1) {
+      dropOldest();
+    }
+  }
+  m_added.notify_all();
+  return seq;
+}
+
+void EventStore::dropOldest() {
+  const Event &event = m_events.front();
+  for (size_t i = 0; i < event.changes.size(); ++i) {
+    const Change &change = event.changes[i];
+    ChangeRef ref(event.seq, i);
+    // the references of an operation are in order, the oldest comes first
+    auto found = m_byOperation.find(change.operation);
+    found->second.pop_front();
+    if (found->second.empty()) {
+      m_byOperation.erase(found);
+    }
+    for (const std::string *path : {&change.oldPath, &change.newPath}) {
+      auto range = m_byPath.equal_range(*path);
+      for (auto it = range.first; it != range.second; ++it) {
+        if (it->second == ref) {
+          m_byPath.erase(it);
+          break;
+        }
+      }
+    }
+  }
+  m_changes -= event.changes.size();
+  m_events.pop_front();
+  ++m_firstSeq;
+}
+
+uint64_t EventStore::clear() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  m_firstSeq += m_events.size();
+  m_events.clear();
+  m_changes = 0;
+  m_byOperation.clear();
+  m_byPath.clear();
+  return m_firstSeq;
+}
+
+void EventStore::setLimit(size_t changes) {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  m_limit = changes;
+  while (m_changes > m_limit && m_events.size() > 1) {
+    dropOldest();
+  }
+}
+
+size_t EventStore::limit() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  return m_limit;
+}
+
+uint64_t EventStore::nextSeq() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  return m_firstSeq + m_events.size();
+}
+
+uint64_t EventStore::firstSeq() {
+  std::lock_guard<std::mutex> lock(m_mutex);
+  return m_firstSeq;
+}
+
+const Event &EventStore::event(uint64_t seq) const {
+  return m_events[seq - m_firstSeq];
+}
+
+std::vector<Event> EventStore::query(const EventQuery &query,
+                                     std::chrono::milliseconds timeout) {
+  std::unique_lock<std::mutex> lock(m_mutex);
+  std::vector<Event> result;
+  m_added.wait_for(lock, timeout, [&]() {
+    result = find(query);
+    return !result.empty();
+  });
+  return result;
+}
+
+bool EventStore::matches(const EventQuery &query, const ChangeRef &ref) const {
+  const Event &event = this->event(ref.first);
+  const Change &change = event.changes[ref.second];
+  auto hasPrefix = [&query](const std::string &path) {
+    return path.compare(0, query.pathPrefix.size(), query.pathPrefix) == 0;
+  };
+  return event.seq >= query.since &&
+         (query.eventType.empty() || event.eventType == query.eventType) &&
+         (query.operation.empty() || change.operation == query.operation) &&
+         (query.pathPrefix.empty() || (change.hasOld && hasPrefix(change.oldPath)) ||
+          (change.hasNew && hasPrefix(change.newPath)));
+}
+
+std::vector<Event> EventStore::find(const EventQuery &query) const {
+  std::vector<ChangeRef> refs;
+  uint64_t since = std::max(query.since, m_firstSeq);
+
+  if (!query.pathPrefix.empty()) {
+    for (auto it = m_byPath.lower_bound(query.pathPrefix);
+         it != m_byPath.end() &&
+         it->first.compare(0, query.pathPrefix.size(), query.pathPrefix) == 0;
+         ++it) {
+      if (it->second.first >= since && matches(query, it->second)) {
+        refs.push_back(it->second);
+      }
+    }
+    std::sort(refs.begin(), refs.end());
+    refs.erase(std::unique(refs.begin(), refs.end()), refs.end());
+  } else if (!query.operation.empty()) {
+    auto found = m_byOperation.find(query.operation);
+    if (found != m_byOperation.end()) {
+      auto begin = std::lower_bound(found->second.begin(), found->second.end(),
+                                    ChangeRef(since, 0));
+      for (auto it = begin; it != found->second.end(); ++it) {
+        if (matches(query, *it)) {
+          refs.push_back(*it);
+        }
+      }
+    }
+  } else {
+    for (uint64_t seq = since; seq < m_firstSeq + m_events.size(); ++seq) {
+      for (size_t c = 0; c < event(seq).changes.size(); ++c) {
+        if (matches(query, ChangeRef(seq, c))) {
+          refs.emplace_back(seq, c);
+        }
+      }
+    }
+  }
+
+  std::vector<Event> result;
+  for (const ChangeRef &ref : refs) {
+    const Event &event = this->event(ref.first);
+    if (result.empty() || result.back().seq != event.seq) {
+      result.push_back(Event{event.seq, event.eventType, {}});
+    }
+    result.back().changes.push_back(event.changes[ref.second]);
+  }
+  return result;
+}
+
+void writeEvent(rapidjson::Writer<rapidjson::StringBuffer> &writer,
+                const Event &event) {
+  writer.StartObject();
+  writer.Key("seq");
+  writer.Uint64(event.seq);
+  writer.Key("event_type");
+  writer.String(event.eventType.c_str());
+  writer.Key("values");
+  writer.StartArray();
+  for (const Change &change : event.changes) {
+    writer.StartObject();
+    writer.Key("operation");
+    writer.String(change.operation.c_str());
+    if (change.hasOld) {
+      writer.Key("old-path");
+      writer.String(change.oldPath.c_str());
+      writer.Key("old-value");
+      writer.String(change.oldValue.c_str());
+    }
+    if (change.hasNew) {
+      writer.Key("new-path");
+      writer.String(change.newPath.c_str());
+      writer.Key("new-value");
+      writer.String(change.newValue.c_str());
+    }
+    writer.EndObject();
+  }
+  writer.EndArray();
+  writer.EndObject();
+}
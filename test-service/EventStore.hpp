@@ -0,0 +1,84 @@
+#pragma once
+
+#include <rapidjson/stringbuffer.h>
+#include <rapidjson/writer.h>
+
+#include <chrono>
+#include <condition_variable>
+#include <cstdint>
+#include <deque>
+#include <map>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <utility>
+#include <vector>
+
+struct Change {
+  std::string operation;
+  bool hasOld = false;
+  std::string oldPath;
+  std::string oldValue;
+  bool hasNew = false;
+  std::string newPath;
+  std::string newValue;
+};
+
+struct Event {
+  uint64_t seq;
+  std::string eventType;
+  std::vector<Change> changes;
+};
+
+struct EventQuery {
+  uint64_t since = 0;
+  std::string eventType;
+  std::string operation;
+  std::string pathPrefix;
+};
+
+// In-memory log of the sysrepo change events, indexed by operation and by
+// path so the tests can query it over HTTP without scanning everything.
+// Events are numbered by a sequence number which keeps counting across
+// clear(), so a reader can always continue where it stopped. Once the
+// events hold more than the limit of changes the oldest ones are dropped.
+class EventStore {
+public:
+  static const size_t DEFAULT_LIMIT = 100000;
+
+  // Stores a copy of event, returns the sequence number assigned to it
+  uint64_t add(const Event &event);
+  uint64_t clear();
+  void setLimit(size_t changes);
+  size_t limit();
+
+  // Returns the events matching query, each with only its matching
+  // changes, waiting up to timeout for the first one to arrive
+  std::vector<Event> query(const EventQuery &query,
+                           std::chrono::milliseconds timeout);
+  uint64_t nextSeq();
+  // Sequence number of the oldest event still stored
+  uint64_t firstSeq();
+
+private:
+  // event sequence number, change index in the event
+  using ChangeRef = std::pair<uint64_t, size_t>;
+
+  std::vector<Event> find(const EventQuery &query) const;
+  bool matches(const EventQuery &query, const ChangeRef &ref) const;
+  const Event &event(uint64_t seq) const;
+  void dropOldest();
+
+  std::deque<Event> m_events;
+  uint64_t m_firstSeq = 0;
+  size_t m_changes = 0;
+  size_t m_limit = DEFAULT_LIMIT;
+  std::unordered_map<std::string, std::deque<ChangeRef>> m_byOperation;
+  std::multimap<std::string, ChangeRef> m_byPath;
+
+  std::mutex m_mutex;
+  std::condition_variable m_added;
+};
+
+void writeEvent(rapidjson::Writer<rapidjson::StringBuffer> &writer,
+                const Event &event);
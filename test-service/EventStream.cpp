@@ -0,0 +1,69 @@
+#include "EventStream.hpp"
+
+#include <chrono>
+#include <iostream>
+
+namespace {
+// Pending data is written out at least this often, or earlier once it
+// grows beyond the high water mark
+const std::chrono::milliseconds FLUSH_INTERVAL(100);
+const size_t HIGH_WATER_MARK = 1 << 20;
+} // namespace
+
+EventStream::EventStream(const std::string &path)
+    : m_file(path, std::ios::out | std::ios::app) {
+  if (!m_file) {
+    std::cerr << "Failed to open event log file " << path << "\n";
+  }
+  m_flusher = std::thread(&EventStream::flushLoop, this);
+}
+
+EventStream::~EventStream() {
+  {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_stopped = true;
+  }
+  m_wakeup.notify_one();
+  m_flusher.join();
+  flush();
+}
+
+void EventStream::append(std::string line) {
+  bool wakeup;
+  {
+    std::lock_guard<std::mutex> lock(m_mutex);
+    m_pending += line;
+    m_pending += '\n';
+    wakeup = m_pending.size() > HIGH_WATER_MARK;
+  }
+  if (wakeup) {
+    m_wakeup.notify_one();
+  }
+}
+
+void EventStream::flush() {
+  std::unique_lock<std::mutex> lock(m_mutex);
+  writePending(lock);
+}
+
+void EventStream::flushLoop() {
+  std::unique_lock<std::mutex> lock(m_mutex);
+  while (!m_stopped) {
+    m_wakeup.wait_for(lock, FLUSH_INTERVAL);
+    writePending(lock);
+  }
+}
+
+void EventStream::writePending(std::unique_lock<std::mutex> &lock) {
+  std::string data;
+  data.swap(m_pending);
+  // Taking the file lock before releasing the buffer lock keeps the
+  // lines of concurrent flushes in order
+  std::lock_guard<std::mutex> fileLock(m_fileMutex);
+  lock.unlock();
+  if (!data.empty()) {
+    m_file.write(data.data(), data.size());
+  }
+  m_file.flush();
+  lock.lock();
+}
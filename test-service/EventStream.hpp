@@ -0,0 +1,34 @@
+#pragma once
+
+#include <condition_variable>
+#include <fstream>
+#include <mutex>
+#include <string>
+#include <thread>
+
+// Append-only event stream file. The file stays open and lines are
+// collected in memory; a background thread writes them out, so the
+// synchronous sysrepo change callbacks never wait for file I/O.
+class EventStream {
+public:
+  explicit EventStream(const std::string &path);
+  EventStream(const EventStream &) = delete;
+  ~EventStream();
+
+  void append(std::string line);
+
+private:
+  // Writes all pending lines to the file before returning
+  void flush();
+  void flushLoop();
+  void writePending(std::unique_lock<std::mutex> &lock);
+
+  std::ofstream m_file;
+  std::string m_pending;
+  bool m_stopped = false;
+
+  std::mutex m_mutex;
+  std::mutex m_fileMutex;
+  std::condition_variable m_wakeup;
+  std::thread m_flusher;
+};
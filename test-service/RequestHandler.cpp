@@ -5,17 +5,46 @@
 #include <rapidjson/error/error.h>
 #include <rapidjson/rapidjson.h>
 
+#include <algorithm>
+#include <chrono>
+#include <stdexcept>
+#include <string>
+#include <thread>
 #include <utility>
+#include <vector>
 
-RequestHandler::RequestHandler(SysrepoListener &sysrepo)
-    : m_endpoint("localhost:9080"), m_sysrepo(sysrepo) {
+RequestHandler::RequestHandler(SysrepoListener &sysrepo,
+                               const std::string &address, size_t threads,
+                               size_t maxPayload)
+    : m_endpoint(Pistache::Address(address)), m_sysrepo(sysrepo) {
   Pistache::Rest::Routes::Post(
       m_router, "/send-notification",
       Pistache::Rest::Routes::bind(&RequestHandler::sendNotification, this));
+  Pistache::Rest::Routes::Post(
+      m_router, "/send-notifications",
+      Pistache::Rest::Routes::bind(&RequestHandler::sendNotifications, this));
   Pistache::Rest::Routes::Post(
       m_router, "/set-action-reply",
       Pistache::Rest::Routes::bind(&RequestHandler::setActionReply, this));
-  m_endpoint.init(Pistache::Http::Endpoint::options().threads(1));
+  // Served only after the sysrepo subscriptions are in place, so a
+  // successful response means the service is ready for the tests
+  Pistache::Rest::Routes::Get(
+      m_router, "/ready",
+      Pistache::Rest::Routes::bind(&RequestHandler::ready, this));
+  Pistache::Rest::Routes::Get(
+      m_router, "/events",
+      Pistache::Rest::Routes::bind(&RequestHandler::getEvents, this));
+  Pistache::Rest::Routes::Delete(
+      m_router, "/events",
+      Pistache::Rest::Routes::bind(&RequestHandler::clearEvents, this));
+  m_endpoint.init(Pistache::Http::Endpoint::options()
+                      // Handlers run concurrently on several threads, so a
+                      // slow sr_notif_send or a long-polling GET /events
+                      // does not hold up the other requests
+                      .threads(threads)
+                      // A batch of notifications easily exceeds Pistache's
+                      // default limit
+                      .maxPayload(maxPayload));
   m_endpoint.setHandler(m_router.handler());
   m_endpoint.serve();
 }
@@ -26,9 +55,91 @@ RequestHandler::RequestHandler(SysrepoListener &sysrepo)
       std::ostringstream oss;                                                  \
       oss << msg;                                                              \
       response.send(Pistache::Http::Code::Bad_Request, oss.str());             \
+      return;                                                                  \
     }                                                                          \
   } while (false);
 
+void RequestHandler::ready(const Pistache::Rest::Request &,
+                           Pistache::Http::ResponseWriter response) {
+  response.send(Pistache::Http::Code::Ok, "ready");
+}
+
+static std::string percentDecode(const std::string &in) {
+  std::string out;
+  for (size_t i = 0; i < in.size(); ++i) {
+    if (in[i] == '%' && i + 2 < in.size()) {
+      out += static_cast<char>(std::stoi(in.substr(i + 1, 2), nullptr, 16));
+      i += 2;
+    } else if (in[i] == '+') {
+      out += ' ';
+    } else {
+      out += in[i];
+    }
+  }
+  return out;
+}
+
+static std::string queryParam(const Pistache::Rest::Request &request,
+                              const std::string &name) {
+  auto value = request.query().get(name);
+  return value.isEmpty() ? std::string() : percentDecode(value.get());
+}
+
+// GET /events?since=<seq>&event-type=...&op=...&path-prefix=...&wait-ms=...
+// returns the matching events (each with only its matching changes) and
+// the sequence number to continue from. With wait-ms the request blocks
+// until a matching event arrives or the time is up.
+void RequestHandler::getEvents(const Pistache::Rest::Request &request,
+                               Pistache::Http::ResponseWriter response) {
+  EventQuery query;
+  std::string since = queryParam(request, "since");
+  std::string waitMs = queryParam(request, "wait-ms");
+  try {
+    query.since = since.empty() ? 0 : std::stoull(since);
+    std::chrono::milliseconds timeout(waitMs.empty() ? 0 : std::stoul(waitMs));
+    query.eventType = queryParam(request, "event-type");
+    query.operation = queryParam(request, "op");
+    query.pathPrefix = queryParam(request, "path-prefix");
+
+    // everything before this has been searched; events added while the
+    // query runs are only covered if they are returned
+    uint64_t next = m_sysrepo.m_eventStore.nextSeq();
+    auto events = m_sysrepo.m_eventStore.query(query, timeout);
+    if (!events.empty()) {
+      next = std::max(next, events.back().seq + 1);
+    }
+
+    rapidjson::StringBuffer buffer;
+    rapidjson::Writer<rapidjson::StringBuffer> writer(buffer);
+    writer.StartObject();
+    writer.Key("next");
+    writer.Uint64(next);
+    writer.Key("first");
+    writer.Uint64(m_sysrepo.m_eventStore.firstSeq());
+    writer.Key("limit");
+    writer.Uint64(m_sysrepo.m_eventStore.limit());
+    writer.Key("events");
+    writer.StartArray();
+    for (const Event &event : events) {
+      writeEvent(writer, event);
+    }
+    writer.EndArray();
+    writer.EndObject();
+    response.send(Pistache::Http::Code::Ok,
+                  std::string(buffer.GetString(), buffer.GetSize()));
+  } catch (const std::logic_error &) {
+    response.send(Pistache::Http::Code::Bad_Request,
+                  "invalid query parameters");
+  }
+}
+
+void RequestHandler::clearEvents(const Pistache::Rest::Request &,
+                                 Pistache::Http::ResponseWriter response) {
+  uint64_t next = m_sysrepo.m_eventStore.clear();
+  response.send(Pistache::Http::Code::Ok,
+                "{\"next\": " + std::to_string(next) + "}");
+}
+
 void RequestHandler::sendNotification(const Pistache::Rest::Request &request,
                                       Pistache::Http::ResponseWriter response) {
   rapidjson::Document d;
@@ -41,7 +152,9 @@ void RequestHandler::sendNotification(const Pistache::Rest::Request &request,
 
     auto values = parseValueList(d["values"]);
     TRY_OR_BAD_REQ(values, "Failed to parse value list");
-    int ret = sr_notif_send(m_sysrepo.m_session, d["xpath"].GetString(),
+    sr_session_ctx_t *session = m_sysrepo.threadSession();
+    TRY_OR_BAD_REQ(session, "Failed to start a sysrepo session");
+    int ret = sr_notif_send(session, d["xpath"].GetString(),
                             values->values, values->valueCount, 0, 0);
     TRY_OR_BAD_REQ(ret == SR_ERR_OK, "Failed to send request to sysrepo");
   }
@@ -49,6 +162,107 @@ void RequestHandler::sendNotification(const Pistache::Rest::Request &request,
   response.send(Pistache::Http::Code::Ok, "");
 }
 
+struct Notification {
+  std::string xpath;
+  std::unique_ptr<SysrepoValues> values;
+};
+
+// Converts one {"xpath": ..., "values": [...]} object, returns false if it
+// is malformed
+static bool parseNotification(const rapidjson::Value &value,
+                              Notification &notification) {
+  if (!value.IsObject() || !value.HasMember("xpath") ||
+      !value["xpath"].IsString() || !value.HasMember("values") ||
+      !value["values"].IsArray()) {
+    return false;
+  }
+  notification.xpath = value["xpath"].GetString();
+  notification.values = parseValueList(value["values"]);
+  return notification.values != nullptr;
+}
+
+// POST /send-notifications?interval-us=<n>
+// sends a batch of notifications, given either as a JSON array or as one
+// JSON object per line (NDJSON). The whole batch is validated before the
+// first one is sent. With interval-us the notifications are sent at that
+// fixed rate instead of as fast as possible.
+void RequestHandler::sendNotifications(const Pistache::Rest::Request &request,
+                                       Pistache::Http::ResponseWriter response) {
+  std::chrono::microseconds interval(0);
+  std::string intervalUs = queryParam(request, "interval-us");
+  try {
+    interval = std::chrono::microseconds(
+        intervalUs.empty() ? 0 : std::stoul(intervalUs));
+  } catch (const std::logic_error &) {
+    response.send(Pistache::Http::Code::Bad_Request, "invalid interval-us");
+    return;
+  }
+
+  const std::string &body = request.body();
+  std::vector<Notification> notifications;
+  size_t first = body.find_first_not_of(" \t\r\n");
+  if (first != std::string::npos && body[first] == '[') {
+    rapidjson::Document d;
+    rapidjson::ParseResult parseResult = d.Parse(body.c_str());
+    TRY_OR_BAD_REQ(parseResult, "Failed to parse JSON document: "
+                                    << GetParseError_En(parseResult.Code()));
+    notifications.resize(d.Size());
+    for (rapidjson::SizeType i = 0; i < d.Size(); ++i) {
+      TRY_OR_BAD_REQ(parseNotification(d[i], notifications[i]),
+                     "Invalid notification " << i);
+    }
+  } else {
+    size_t line = 0;
+    for (size_t start = 0; start < body.size(); ++line) {
+      size_t end = body.find('\n', start);
+      if (end == std::string::npos) {
+        end = body.size();
+      }
+      std::string text = body.substr(start, end - start);
+      start = end + 1;
+      if (text.find_first_not_of(" \t\r") == std::string::npos) {
+        continue;
+      }
+      rapidjson::Document d;
+      rapidjson::ParseResult parseResult = d.Parse(text.c_str());
+      TRY_OR_BAD_REQ(parseResult, "Failed to parse line "
+                                      << line << ": "
+                                      << GetParseError_En(parseResult.Code()));
+      notifications.emplace_back();
+      TRY_OR_BAD_REQ(parseNotification(d, notifications.back()),
+                     "Invalid notification on line " << line);
+    }
+  }
+
+  sr_session_ctx_t *session = m_sysrepo.threadSession();
+  TRY_OR_BAD_REQ(session, "Failed to start a sysrepo session");
+
+  // Paced against the start time so that slow sends do not add up
+  size_t sent = 0;
+  size_t failed = 0;
+  auto start = std::chrono::steady_clock::now();
+  for (size_t i = 0; i < notifications.size(); ++i) {
+    if (interval.count()) {
+      std::this_thread::sleep_until(start + i * interval);
+    }
+    const Notification &n = notifications[i];
+    if (sr_notif_send(session, n.xpath.c_str(), n.values->values,
+                      n.values->valueCount, 0, 0) == SR_ERR_OK) {
+      ++sent;
+    } else {
+      ++failed;
+    }
+  }
+  auto elapsed = std::chrono::duration_cast<std::chrono::microseconds>(
+      std::chrono::steady_clock::now() - start);
+
+  response.send(Pistache::Http::Code::Ok,
+                "{\"sent\": " + std::to_string(sent) +
+                    ", \"failed\": " + std::to_string(failed) +
+                    ", \"elapsed-us\": " + std::to_string(elapsed.count()) +
+                    "}");
+}
+
 void RequestHandler::setActionReply(const Pistache::Rest::Request &request,
                                     Pistache::Http::ResponseWriter response) {
 
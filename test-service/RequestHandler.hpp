@@ -9,13 +9,23 @@
 #include <rapidjson/rapidjson.h>
 
 #include <memory>
+#include <string>
 
 class RequestHandler {
 public:
-  RequestHandler(SysrepoListener &sysrepo);
-
+  RequestHandler(SysrepoListener &sysrepo, const std::string &address,
+                 size_t threads, size_t maxPayload);
+
+  void ready(const Pistache::Rest::Request &request,
+             Pistache::Http::ResponseWriter response);
+  void getEvents(const Pistache::Rest::Request &request,
+                 Pistache::Http::ResponseWriter response);
+  void clearEvents(const Pistache::Rest::Request &request,
+                   Pistache::Http::ResponseWriter response);
   void sendNotification(const Pistache::Rest::Request &request,
                         Pistache::Http::ResponseWriter response);
+  void sendNotifications(const Pistache::Rest::Request &request,
+                         Pistache::Http::ResponseWriter response);
   void setActionReply(const Pistache::Rest::Request &request,
                       Pistache::Http::ResponseWriter response);
 
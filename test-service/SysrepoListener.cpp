@@ -2,7 +2,6 @@
 
 #include <sysrepo/xpath.h>
 
-#include <fstream>
 #include <iostream>
 #include <sstream>
 #include <string.h>
@@ -127,7 +126,8 @@ static void my_sr_log_cb(sr_log_level_t level, const char *msg)
       std::cerr << "sysrepo(" << level << ") " << msg << "\n"; 
 }
 
-SysrepoListener::SysrepoListener() {
+SysrepoListener::SysrepoListener(const std::string &eventStreamPath)
+    : m_eventStream(eventStreamPath) {
     sr_log_set_cb(my_sr_log_cb);
 }
 
@@ -236,6 +236,7 @@ int SysrepoListener::subscribeToAll() {
     {
       std::cerr << "Subscribed to xpath " << xpath << "\n";
     }
+    std::lock_guard<std::mutex> lock(m_subscribeMutex);
     m_subscribedActions.insert(xpath);
   }
   return SR_ERR_OK;
@@ -254,46 +255,68 @@ int SysrepoListener::changeTrampoline(sr_session_ctx_t *session,
 
 int SysrepoListener::handleChanges(sr_session_ctx_t *session,
                                    const char *module, sr_event_t event) {
-  std::ofstream events("/tmp/test-service-event-stream.yml",
-                       std::ios::out | std::ios::app | std::ios::ate);
-  if (!events) {
-    std::cerr << "Failed to open event log file\n";
-    return SR_ERR_OPERATION_FAILED;
-  }
   sr_change_iter_t *iter;
   SR_TRY(sr_get_changes_iter(session, "//.", &iter));
 
-  events << "---\n";
-  events << "event_type: " << to_string(event) << "\n";
-  events << "values:\n";
+  Event changeEvent;
+  changeEvent.eventType = to_string(event);
 
   sr_val_t *old;
   sr_val_t *new_;
   sr_change_oper_t op;
   while (sr_get_change_next(session, iter, &op, &old, &new_) == SR_ERR_OK) {
-    events << "  - operation: " << to_string(op) << "\n";
+    Change change;
+    change.operation = to_string(op);
     if (old) {
-      events << "    old-path: " << old->xpath << "\n";
+      change.hasOld = true;
+      change.oldPath = old->xpath;
       char *v = sr_val_to_str(old);
-      events << "    old-value: " << v << "\n";
+      change.oldValue = v ? v : "";
       free(v);
     }
 
     if (new_) {
-      events << "    new-path: " << new_->xpath << "\n";
+      change.hasNew = true;
+      change.newPath = new_->xpath;
       char *v = sr_val_to_str(new_);
-      events << "    new-value: " << v << "\n";
+      change.newValue = v ? v : "";
       free(v);
     }
+    changeEvent.changes.push_back(std::move(change));
+    sr_free_val(old);
+    sr_free_val(new_);
   }
 
   sr_free_change_iter(iter);
 
+  changeEvent.seq = m_eventStore.add(changeEvent);
+
+  // The stream file keeps a trace of all events, one JSON object per line
+  rapidjson::StringBuffer buffer;
+  rapidjson::Writer<rapidjson::StringBuffer> writer(buffer);
+  writeEvent(writer, changeEvent);
+  m_eventStream.append(std::string(buffer.GetString(), buffer.GetSize()));
+
   return SR_ERR_OK;
 }
 
+sr_session_ctx_t *SysrepoListener::threadSession() {
+  // There is a single listener per process, so a plain thread_local is
+  // enough. The sessions live as long as their threads, i.e. the process.
+  thread_local sr_session_ctx_t *session = nullptr;
+  if (!session &&
+      sr_session_start(m_connection, SR_DS_RUNNING, &session) != SR_ERR_OK) {
+    std::cerr << "Failed to start a sysrepo session\n";
+    session = nullptr;
+  }
+  return session;
+}
+
 bool SysrepoListener::subscribeForAction(const char *xpath) {
   std::string key(xpath);
+  // Not m_actionMutex: sr_rpc_subscribe_tree() waits for the callbacks
+  // running on sysrepo's thread, and handleAction() takes m_actionMutex
+  std::lock_guard<std::mutex> lock(m_subscribeMutex);
   if (m_subscribedActions.find(key) != m_subscribedActions.end()) {
     // Already subscribed
     return true;
@@ -330,6 +353,7 @@ static std::string xpathToSchemaPath(const char *xpath) {
 void SysrepoListener::setActionValues(const char *xpath,
                                       std::unique_ptr<SysrepoValues> &&values) {
   std::string schema(xpathToSchemaPath(xpath));
+  std::lock_guard<std::mutex> lock(m_actionMutex);
   m_actionValues[schema] = std::move(values);
 }
 
@@ -349,12 +373,21 @@ int SysrepoListener::handleAction(sr_session_ctx_t *session, const char *xpath,
 {
   std::string schemaPath(xpathToSchemaPath(xpath));
 
-  auto values = m_actionValues.find(schemaPath);
-  if (values == m_actionValues.end()) {
+  // Hold a reference so that a concurrent setActionValues cannot free the
+  // values while the reply is built
+  std::shared_ptr<SysrepoValues> values;
+  {
+    std::lock_guard<std::mutex> lock(m_actionMutex);
+    auto found = m_actionValues.find(schemaPath);
+    if (found != m_actionValues.end()) {
+      values = found->second;
+    }
+  }
+  if (!values) {
     std::cerr << "Unexpected action at XPath " << xpath << " (schema path "
               << schemaPath << ")\n";
     return SR_ERR_INTERNAL;
   }
-  lyd_new_term(output, output->schema->module, "action-output", values->second->values->data.string_val, 1, NULL);
+  lyd_new_term(output, output->schema->module, "action-output", values->values->data.string_val, 1, NULL);
   return SR_ERR_OK;
 }
@@ -1,9 +1,13 @@
 #pragma once
 
+#include "EventStore.hpp"
+#include "EventStream.hpp"
+
 #include <sysrepo.h>
 #include <sysrepo/values.h>
 
 #include <memory>
+#include <mutex>
 #include <vector>
 #include <string>
 #include <unordered_map>
@@ -22,11 +26,16 @@ struct SysrepoValues {
 class SysrepoListener {
 public:
   SysrepoListener(const SysrepoListener &) = delete;
-  SysrepoListener();
+  explicit SysrepoListener(const std::string &eventStreamPath);
   void listen();
 
   sr_session_ctx_t *m_session = nullptr;
   const struct ly_ctx *m_ly_ctx = nullptr;
+  EventStore m_eventStore;
+
+  // Session of the calling thread, started on first use; sysrepo sessions
+  // must not be shared between threads sending concurrently
+  sr_session_ctx_t *threadSession();
 
   bool subscribeForAction(const char *xpath);
   void setActionValues(const char *xpath,
@@ -67,8 +76,16 @@ private:
   sr_conn_ctx_t *m_connection = nullptr;
   sr_subscription_ctx_t *m_subscription = nullptr;
 
+  // guards the action replies, which are set from the request handler
+  // threads and read from sysrepo's callback thread
+  std::mutex m_actionMutex;
   std::unordered_map<std::string, std::shared_ptr<SysrepoValues>>
       m_actionValues;
+  // serializes the action subscriptions. It is never taken on sysrepo's
+  // callback thread, which holds the subscription's lock while it waits
+  // for m_actionMutex, so it may be held while subscribing.
+  std::mutex m_subscribeMutex;
   std::unordered_set<std::string> m_subscribedActions;
   std::unordered_map<std::string, std::string> m_module2Schema;
+  EventStream m_eventStream;
 };
@@ -1,16 +1,31 @@
 #include "RequestHandler.hpp"
 #include "SysrepoListener.hpp"
 
+#include <cstdlib>
+#include <string>
 #include <unistd.h>
 
+static const char *envOr(const char *name, const char *fallback) {
+  const char *value = std::getenv(name);
+  return value ? value : fallback;
+}
+
 int main(int, char **) {
-  SysrepoListener l;
+  // Parallel test workers run their own instance on a distinct port
+  SysrepoListener l(envOr("TEST_SERVICE_EVENT_STREAM",
+                          "/tmp/test-service-event-stream.jsonl"));
+  // number of changes kept for GET /events, the oldest events are dropped
+  l.m_eventStore.setLimit(std::stoul(envOr("TEST_SERVICE_EVENT_LIMIT",
+                                           "100000")));
   std::cout << "test-service: trying to connect to sysrepo" << std::endl;
   l.listen();
 
   std::cout << "test-service: connected to sysrepo, starting request-handler" << std::endl;
 
-  RequestHandler handler(l);
+  RequestHandler handler(l, envOr("TEST_SERVICE_ADDRESS", "localhost:9080"),
+                         std::stoul(envOr("TEST_SERVICE_THREADS", "4")),
+                         std::stoul(envOr("TEST_SERVICE_MAX_PAYLOAD",
+                                          "67108864")));
 
   while (true) {
     pause();
@@ -0,0 +1,259 @@
+"""
+Scaling report for the scale benchmarks
+
+Fits every create/delete series of benchmark.jsonl (median wall time over
+vlan_count) to O(n), O(n log n) and O(n^2) models, prints a summary table
+and flags series growing faster than linear. Optionally plots the series
+as SVG (no dependencies) or PNG (needs matplotlib).
+
+    python3 bench_report.py [--svg FILE] [--png FILE] [benchmark.jsonl]
+"""
+import argparse
+import math
+import statistics
+import sys
+from collections import defaultdict
+
+from benchmark import BENCHMARK_RESULTS, linear_fit, load_results
+
+
+MODELS = [
+    ("O(n)", lambda n: n),
+    ("O(n log n)", lambda n: n * math.log(n)),
+    ("O(n^2)", lambda n: n * n),
+]
+
+COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b"]
+
+
+def series_test(entry):
+    """The test of an entry, with the framing of the framing benchmarks"""
+    if entry.get("framing"):
+        return "{}[{}]".format(entry["test"], entry["framing"])
+    return entry["test"]
+
+
+def collect_series(entries):
+    """Returns {(test, phase): [(vlan_count, median wall), ...]} sorted by vlan_count"""
+    points = defaultdict(lambda: defaultdict(list))
+    for entry in entries:
+        if entry.get("vlan_count") is None or entry.get("error"):
+            continue
+        points[(series_test(entry), entry["phase"])][entry["vlan_count"]].append(
+            entry["wall"]
+        )
+
+    return {
+        key: sorted((n, statistics.median(walls)) for n, walls in by_count.items())
+        for key, by_count in points.items()
+    }
+
+
+def fit_series(series):
+    """
+    Fits series to each of MODELS. Returns the name of the best model, the
+    fitted parameters of all models and the growth exponent k, fitted in
+    log-log space as (wall - wall_0) ~ (n - n_0)^k relative to the smallest
+    vlan_count so that constant per-request overhead does not hide it.
+    """
+    ns = [n for n, _ in series]
+    walls = [w for _, w in series]
+
+    fits = {}
+    for name, model in MODELS:
+        slope, intercept, rss = linear_fit([model(n) for n in ns], walls)
+        fits[name] = (slope, intercept, rss)
+    best = min(fits, key=lambda name: fits[name][2])
+
+    n_0, wall_0 = series[0]
+    growth = [(n - n_0, w - wall_0) for n, w in series[1:] if w > wall_0]
+    if len(growth) >= 2:
+        exponent = linear_fit(
+            [math.log(n) for n, _ in growth], [math.log(w) for _, w in growth]
+        )[0]
+    else:
+        exponent = None
+
+    return best, fits, exponent
+
+
+def analyze(entries, max_exponent):
+    rows = []
+    for (test, phase), series in sorted(collect_series(entries).items()):
+        if len(series) < 3:
+            continue
+        best, fits, exponent = fit_series(series)
+        flagged = exponent is not None and exponent > max_exponent
+        rows.append(
+            {
+                "test": test,
+                "phase": phase,
+                "series": series,
+                "best": best,
+                "fits": fits,
+                "exponent": exponent,
+                "flagged": flagged,
+            }
+        )
+    return rows
+
+
+def print_table(rows, out=sys.stdout):
+    header = "{:<32} {:<8} {:>6} {:>10} {:>10} {:<11} {:>9}  {}".format(
+        "test", "phase", "points", "n max", "wall max", "best fit", "exponent", ""
+    )
+    out.write(header + "\n")
+    out.write("-" * len(header) + "\n")
+    for row in rows:
+        n_max, wall_max = row["series"][-1]
+        exponent = "-" if row["exponent"] is None else "{:.2f}".format(row["exponent"])
+        out.write(
+            "{:<32} {:<8} {:>6} {:>10} {:>9.3f}s {:<11} {:>9}  {}\n".format(
+                row["test"],
+                row["phase"],
+                len(row["series"]),
+                n_max,
+                wall_max,
+                row["best"],
+                exponent,
+                "SUPER-LINEAR" if row["flagged"] else "",
+            )
+        )
+
+
+def write_svg(rows, path, width=800, height=500, margin=60):
+    """Plots the series and their best fit without any plotting library"""
+    n_max = max(n for row in rows for n, _ in row["series"])
+    wall_max = max(w for row in rows for _, w in row["series"]) or 1.0
+
+    def x(n):
+        return margin + (width - 2 * margin) * n / n_max
+
+    def y(wall):
+        return height - margin - (height - 2 * margin) * wall / wall_max
+
+    parts = [
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{}" height="{}" '
+        'font-family="sans-serif" font-size="12">'.format(width, height),
+        '<rect width="100%" height="100%" fill="white"/>',
+        '<line x1="{0}" y1="{1}" x2="{2}" y2="{1}" stroke="black"/>'.format(
+            margin, height - margin, width - margin
+        ),
+        '<line x1="{0}" y1="{1}" x2="{0}" y2="{2}" stroke="black"/>'.format(
+            margin, height - margin, margin
+        ),
+        '<text x="{}" y="{}" text-anchor="middle">vlan_count</text>'.format(
+            width / 2, height - 15
+        ),
+        '<text x="15" y="{}" transform="rotate(-90 15 {})" '
+        'text-anchor="middle">wall time [s]</text>'.format(height / 2, height / 2),
+    ]
+    for i in range(5):
+        n = n_max * (i + 1) / 5
+        wall = wall_max * (i + 1) / 5
+        parts.append(
+            '<text x="{:.1f}" y="{}" text-anchor="middle">{:.0f}</text>'.format(
+                x(n), height - margin + 15, n
+            )
+        )
+        parts.append(
+            '<text x="{}" y="{:.1f}" text-anchor="end">{:.2f}</text>'.format(
+                margin - 5, y(wall) + 4, wall
+            )
+        )
+
+    for i, row in enumerate(rows):
+        color = COLORS[i % len(COLORS)]
+        points = " ".join("{:.1f},{:.1f}".format(x(n), y(w)) for n, w in row["series"])
+        parts.append(
+            '<polyline points="{}" fill="none" stroke="{}" stroke-width="2"/>'.format(
+                points, color
+            )
+        )
+
+        model = dict(MODELS)[row["best"]]
+        slope, intercept, _ = row["fits"][row["best"]]
+        ns = [row["series"][0][0] + k * (n_max - row["series"][0][0]) / 50 for k in range(51)]
+        ns = [n for n in ns if n <= row["series"][-1][0]]
+        fitted = " ".join(
+            "{:.1f},{:.1f}".format(x(n), y(slope * model(n) + intercept)) for n in ns
+        )
+        parts.append(
+            '<polyline points="{}" fill="none" stroke="{}" '
+            'stroke-dasharray="4 3"/>'.format(fitted, color)
+        )
+        parts.append(
+            '<text x="{}" y="{}" fill="{}">{} {} ({}){}</text>'.format(
+                margin + 10,
+                margin + 15 * i,
+                color,
+                row["test"],
+                row["phase"],
+                row["best"],
+                " SUPER-LINEAR" if row["flagged"] else "",
+            )
+        )
+
+    parts.append("</svg>")
+    with open(path, "w") as f:
+        f.write("\n".join(parts) + "\n")
+
+
+def write_png(rows, path):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib import pyplot
+
+    figure, axes = pyplot.subplots()
+    for row in rows:
+        ns = [n for n, _ in row["series"]]
+        label = "{} {} ({})".format(row["test"], row["phase"], row["best"])
+        axes.plot(ns, [w for _, w in row["series"]], marker="o", label=label)
+    axes.set_xlabel("vlan_count")
+    axes.set_ylabel("wall time [s]")
+    axes.legend(fontsize="small")
+    figure.savefig(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("results", nargs="?", default=BENCHMARK_RESULTS)
+    parser.add_argument(
+        "--max-exponent",
+        type=float,
+        default=1.3,
+        help="flag series growing faster than n^k (default: 1.3, "
+        "n log n is about 1.1-1.25 for 10..1000)",
+    )
+    parser.add_argument("--svg", help="write a plot of all series as SVG")
+    parser.add_argument("--png", help="write a plot of all series as PNG")
+    parser.add_argument(
+        "--fail-on-superlinear",
+        action="store_true",
+        help="exit with 1 if any series is flagged",
+    )
+    args = parser.parse_args()
+
+    rows = analyze(load_results(args.results), args.max_exponent)
+    if not rows:
+        print("no series with at least 3 vlan_count points in " + args.results)
+        return 0
+
+    print_table(rows)
+    if args.svg:
+        write_svg(rows, args.svg)
+    if args.png:
+        try:
+            write_png(rows, args.png)
+        except ImportError:
+            print("matplotlib is not installed, use --svg instead")
+            return 2
+
+    if args.fail_on_superlinear and any(row["flagged"] for row in rows):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
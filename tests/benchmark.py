@@ -0,0 +1,386 @@
+"""
+Structured recording of benchmark results
+
+Every measurement is appended as one JSON object per line to
+BENCHMARK_RESULTS and as one row to BENCHMARK_CSV, so results of nightly
+runs can be compared and plotted without scraping free-form text.
+"""
+import bisect
+import csv
+import datetime
+import json
+import os
+import socket
+import statistics
+import subprocess
+import time
+
+from sampler import mark_phase, process_stat, stat_cpu_time
+
+
+BENCHMARK_RESULTS = "/var/log/benchmark.jsonl"
+BENCHMARK_CSV = "/var/log/benchmark.csv"
+
+NETOPEER2_PID_FILE = "/var/run/netopeer2-server.pid"
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "repo")
+NC2_PKGS = ["libyang", "libnetconf2", "sysrepo", "Netopeer2"]
+
+
+def read_pid(pid_file=NETOPEER2_PID_FILE):
+    """Returns the pid stored in pid_file or None"""
+    try:
+        with open(pid_file, "r") as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def process_rss(pid):
+    """Returns the resident set size of a process in kB or None"""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def process_cpu_time(pid):
+    """Returns user+system CPU time of a process in seconds or None"""
+    if pid is None:
+        return None
+    fields = process_stat(pid)
+    return None if fields is None else stat_cpu_time(fields)
+
+
+def package_revisions(repo_dir=REPO_DIR):
+    """Returns the git revision of each package checked out below repo/"""
+    revisions = {}
+    for pkg in NC2_PKGS:
+        try:
+            rev = subprocess.check_output(
+                ["git", "-C", os.path.join(repo_dir, pkg), "rev-parse", "HEAD"],
+                stderr=subprocess.DEVNULL,
+            )
+            revisions[pkg] = rev.decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            revisions[pkg] = "unknown"
+    return revisions
+
+
+class BenchMark:
+    """
+    Measures wall time (monotonic clock), client CPU time and the CPU time
+    and RSS of netopeer2-server for the enclosed block. With a label its
+    start and stop are marked in the running resource samplers.
+    """
+
+    def __init__(self, pid=None, label=None):
+        self.pid = pid if pid is not None else read_pid()
+        self.label = label
+        self.start = 0.0
+        self.stop = 0.0
+        self.elapsed = 0.0
+        self.cpu = 0.0
+        self.server_cpu = None
+        self.rss_before = None
+        self.rss_after = None
+        self.error = None
+        # set by Trials for the iterations that are not kept
+        self.warmup = False
+
+    def __enter__(self):
+        if self.label is not None:
+            mark_phase(self.label, "start")
+        self.rss_before = process_rss(self.pid)
+        self._server_cpu_start = process_cpu_time(self.pid)
+        self._cpu_start = time.process_time()
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exctyp, excval, exctrc):
+        self.stop = time.monotonic()
+        self.elapsed = self.stop - self.start
+        self.cpu = time.process_time() - self._cpu_start
+        server_cpu_stop = process_cpu_time(self.pid)
+        if self._server_cpu_start is not None and server_cpu_stop is not None:
+            self.server_cpu = server_cpu_stop - self._server_cpu_start
+        self.rss_after = process_rss(self.pid)
+        if self.label is not None:
+            mark_phase(self.label, "stop")
+        return False
+
+
+def percentile(samples, pct):
+    """Returns the pct-th percentile of samples, interpolating linearly"""
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    pos = (len(ordered) - 1) * pct / 100.0
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def outliers(samples):
+    """Returns the indices of samples outside of Tukey's fences (1.5 IQR)"""
+    if len(samples) < 4:
+        return []
+    q1 = percentile(samples, 25)
+    q3 = percentile(samples, 75)
+    low = q1 - 1.5 * (q3 - q1)
+    high = q3 + 1.5 * (q3 - q1)
+    return [i for i, x in enumerate(samples) if x < low or x > high]
+
+
+def summarize(samples):
+    """Returns min/median/mean/p95/stddev and the outliers of samples"""
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.mean(samples),
+        "p95": percentile(samples, 95),
+        "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "outliers": outliers(samples),
+    }
+
+
+HISTOGRAM_BOUNDS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10]
+
+
+def latency_histogram(samples, bounds=HISTOGRAM_BOUNDS):
+    """
+    Counts samples per bucket, returns [[upper bound, count], ...] with a
+    final [None, count] bucket for samples above the last bound
+    """
+    counts = [0] * (len(bounds) + 1)
+    for sample in samples:
+        counts[bisect.bisect_left(bounds, sample)] += 1
+    return [[bound, count] for bound, count in zip(bounds + [None], counts)]
+
+
+def linear_fit(xs, ys):
+    """
+    Least squares fit of ys = slope * xs + intercept, returns
+    (slope, intercept, sum of squared residuals)
+    """
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    slope = sxy / sxx if sxx else 0.0
+    intercept = mean_y - slope * mean_x
+    rss = sum((y - slope * x - intercept) ** 2 for x, y in zip(xs, ys))
+    return slope, intercept, rss
+
+
+def trend(samples, per=100):
+    """
+    Fits a line through samples taken once per iteration and returns its
+    increase over per iterations and its value at the first iteration
+    """
+    slope, intercept, _ = linear_fit(list(range(len(samples))), samples)
+    return slope * per, intercept
+
+
+class Trials:
+    """
+    Runs a sequence of phases for warmup + repeat iterations. Each phase is a
+    callable receiving the BenchMark measuring it; only the measurements of
+    the repeat iterations after the warmup are kept. pid is the
+    netopeer2-server measured, by default that of the default stack.
+    """
+
+    def __init__(self, warmup=0, repeat=1, pid=None):
+        self.warmup = warmup
+        self.repeat = repeat
+        self.pid = pid
+
+    def run(self, *phases):
+        results = [[] for _ in phases]
+        for iteration in range(self.warmup + self.repeat):
+            for result, phase in zip(results, phases):
+                with BenchMark(pid=self.pid, label=phase.__name__) as b:
+                    b.warmup = iteration < self.warmup
+                    phase(b)
+                if iteration >= self.warmup:
+                    result.append(b)
+        return results
+
+
+class BenchmarkRecorder:
+    """Appends benchmark records to a JSON-lines and a CSV file"""
+
+    FIELDS = [
+        "run_id",
+        "timestamp",
+        "test",
+        "test_id",
+        "vlan_count",
+        "phase",
+        "wall",
+        "wall_min",
+        "wall_median",
+        "wall_p95",
+        "wall_stddev",
+        "outliers",
+        "cpu",
+        "server_cpu",
+        "rss_before",
+        "rss_after",
+        "repeat",
+        "sessions",
+        "operations",
+        "throughput",
+        "framing",
+        "bytes",
+        "mb_per_s",
+        "error",
+    ]
+
+    def __init__(self, json_file=BENCHMARK_RESULTS, csv_file=BENCHMARK_CSV):
+        self.json_file = json_file
+        self.csv_file = csv_file
+        self.run_id = "{}-{}".format(
+            socket.gethostname(), datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        )
+        self.revisions = package_revisions()
+        self.csv_fields = self.FIELDS + ["rev_" + pkg for pkg in NC2_PKGS]
+
+    def clear(self):
+        for path in [self.json_file, self.csv_file]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def record(self, request, phase, benches, **params):
+        """
+        Stores the measurements for the running test. benches is a single
+        BenchMark or the list of repetitions returned by Trials.run(); times
+        are reported as medians over the repetitions. Extra keyword
+        arguments (like vlan_count) are stored along with it.
+        """
+        if isinstance(benches, BenchMark):
+            benches = [benches]
+        walls = [b.elapsed for b in benches]
+        stats = summarize(walls)
+        server_cpus = [b.server_cpu for b in benches if b.server_cpu is not None]
+        errors = [b.error for b in benches if b.error is not None]
+        return self.record_entry(
+            request,
+            phase,
+            wall=stats["median"],
+            wall_min=stats["min"],
+            wall_median=stats["median"],
+            wall_mean=stats["mean"],
+            wall_p95=stats["p95"],
+            wall_stddev=stats["stddev"],
+            outliers=stats["outliers"],
+            samples=walls,
+            cpu=statistics.median([b.cpu for b in benches]),
+            server_cpu=statistics.median(server_cpus) if server_cpus else None,
+            rss_before=benches[0].rss_before,
+            rss_after=benches[-1].rss_after,
+            repeat=len(benches),
+            error=errors[0] if errors else None,
+            **params
+        )
+
+    def record_load(self, request, phase, load, **params):
+        """Stores the outcome of a loadgen.run_sessions() run"""
+        return self.record_entry(
+            request,
+            phase,
+            wall=load.wall,
+            sessions=len(load.sessions),
+            operations=load.operations,
+            throughput=load.throughput,
+            latency=load.latency_summary(),
+            session_latency=[s.latency_summary() for s in load.sessions],
+            histograms=[s.histograms() for s in load.sessions],
+            repeat=1,
+            error=load.errors[0] if load.errors else None,
+            **params
+        )
+
+    def record_entry(self, request, phase, **fields):
+        """Stores an arbitrary set of fields for the running test"""
+        # session scoped fixtures record entries without a test function
+        function = getattr(request, "function", None)
+        entry = {
+            "run_id": self.run_id,
+            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "test": function.__name__ if function is not None else None,
+            "test_id": request.node.name,
+            "phase": phase,
+        }
+        entry.update(fields)
+        entry["revisions"] = self.revisions
+        self.write(entry)
+        return entry
+
+    def write(self, entry):
+        with open(self.json_file, "a") as f:
+            f.write(json.dumps(entry, sort_keys=True) + "\n")
+
+        new_file = not os.path.exists(self.csv_file)
+        with open(self.csv_file, "a", newline="") as f:
+            writer = csv.DictWriter(f, self.csv_fields, extrasaction="ignore")
+            if new_file:
+                writer.writeheader()
+            row = dict(entry)
+            row.update(
+                {"rev_" + pkg: rev for pkg, rev in entry["revisions"].items()}
+            )
+            writer.writerow(row)
+
+
+def load_results(path=BENCHMARK_RESULTS):
+    """Reads back all records of a JSON-lines results file"""
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Baseline:
+    """
+    Results of an earlier run, indexed by test, framing, vlan_count and
+    phase, to detect latency regressions of the current run
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {self.key(entry): entry for entry in load_results(path)}
+
+    @staticmethod
+    def key(entry):
+        return (entry["test"], entry.get("framing"), entry.get("vlan_count"), entry["phase"])
+
+    def regressions(self, entries, threshold):
+        """
+        Returns a description of every entry whose median wall time exceeds
+        the baseline by more than threshold (a fraction, 0.2 means 20%)
+        """
+        messages = []
+        for entry in entries:
+            base = self.entries.get(self.key(entry))
+            if base is None or not base["wall"]:
+                continue
+            ratio = entry["wall"] / base["wall"]
+            if ratio > 1 + threshold:
+                messages.append(
+                    "{} {}: {:.3f} sec vs. {:.3f} sec in baseline "
+                    "(+{:.0f}%, threshold {:.0f}%)".format(
+                        entry["test_id"],
+                        entry["phase"],
+                        entry["wall"],
+                        base["wall"],
+                        (ratio - 1) * 100,
+                        threshold * 100,
+                    )
+                )
+        return messages
@@ -1,7 +1,11 @@
+import functools
+import json
 import os
+import re
 import time
 import string
 import subprocess
+import threading
 from lxml import etree
 
 import requests
@@ -9,27 +13,100 @@ import logging
 from ncclient.manager import connect_ssh
 
 
-def wait_for(f, timeout=10, period=0.5):
-    while timeout > 0:
+# Under pytest-xdist every worker but the first (gw0) runs against its own
+# sysrepo repository, netopeer2-server and test-service, see workers.py
+WORKER_INDEX = int(os.environ.get("PYTEST_XDIST_WORKER", "gw0")[2:])
+NETCONF_PORT = 830 + WORKER_INDEX
+TLS_PORT = 6513 + WORKER_INDEX
+TEST_SERVICE_URL = "http://localhost:{}".format(9080 + WORKER_INDEX)
+
+
+def wait_for(f, timeout=10, period=0.5, backoff=1, max_period=None):
+    """
+    Retries f until it does not raise or timeout expires. The period
+    between attempts is multiplied by backoff after each one, up to
+    max_period.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
         try:
             return f()
         except Exception:
             pass
-        time.sleep(period)
-        timeout -= period
+        time.sleep(min(period, max(deadline - time.monotonic(), 0)))
+        period *= backoff
+        if max_period is not None:
+            period = min(period, max_period)
 
     return f()
 
 
-def connect_mgr():
-    return connect_ssh(
+def connect_mgr(**kwds):
+    """
+    Connects to the NETCONF server of this worker, keyword arguments are
+    passed on to connect_ssh() and override the defaults
+    """
+    params = dict(
         host="localhost",
-        port=830,
+        port=NETCONF_PORT,
         username="netconf",
         password="netconf",
         hostkey_verify=False,
         timeout=180,
     )
+    params.update(kwds)
+    return connect_ssh(**params)
+
+
+class SessionPool:
+    """
+    Keeps NETCONF sessions open between tests so that not every test pays
+    for the SSH key exchange and the NETCONF hello
+    """
+
+    def __init__(self, connect=connect_mgr):
+        self._connect = connect
+        self._idle = []
+
+    def acquire(self):
+        """Returns an idle connected session or a new one"""
+        while self._idle:
+            mgr = self._idle.pop()
+            if mgr.connected:
+                return mgr
+            self._discard(mgr)
+        return self._connect()
+
+    def release(self, mgr, reuse=True):
+        """Takes a session back, closing it if it is not reusable"""
+        if reuse and self._reset(mgr):
+            self._idle.append(mgr)
+        else:
+            self._discard(mgr)
+
+    def close(self):
+        while self._idle:
+            self._discard(self._idle.pop())
+
+    @staticmethod
+    def _reset(mgr):
+        """Drops uncommitted candidate changes left behind by the test"""
+        if not mgr.connected:
+            return False
+        try:
+            mgr.discard_changes()
+        except Exception:
+            return False
+        return True
+
+    @staticmethod
+    def _discard(mgr):
+        try:
+            if mgr.connected:
+                mgr.close_session()
+        except Exception:
+            pass
+
 
 def nacm_enable(on_off):
     rpc = "/tmp/nacm-on.rpc"
@@ -89,6 +166,7 @@ NS_MAP = {
     "test-notification": "http://www.example.com/ns/yang/test-notifications",
     "notif": "urn:ietf:params:xml:ns:netconf:notification:1.0",
     "nc-notif": "urn:ietf:params:xml:ns:yang:ietf-netconf-notifications",
+    "nm-notif": "urn:ietf:params:xml:ns:netmod:notification",
     "test-actions": "http://example.com/netopeer2-integration-tests/test-actions",
     "test-actions-aug": "http://example.com/netopeer2-integration-tests/test-actions-augment",
     "test-when": "http://example.com/netopeer2-integration-tests/test-when",
@@ -129,7 +207,7 @@ def get_contact(mgr):
     """,
     )
 
-    node = r.data_ele.xpath("//sys:contact", namespaces=NS_MAP)
+    node = find_xpath(r.data_ele, "//sys:contact")
     if not node:
         return "Not Present"
     else:
@@ -157,69 +235,140 @@ def xml_to_dict(root):
     return d
 
 
-def send_notification(notification):
-    result = requests.post("http://localhost:9080/send-notification", json=notification)
-    assert result.ok
+_http = threading.local()
 
 
-def set_action_reply(action):
-    result = requests.post("http://localhost:9080/set-action-reply", json=action)
-    assert result.ok
+def service_session():
+    """
+    Returns the calling thread's persistent HTTP session to the
+    test-service, so that consecutive requests reuse one connection
+    """
+    if not hasattr(_http, "session"):
+        _http.session = requests.Session()
+    return _http.session
 
 
-def test_send_notification_service_ready():
-    result = requests.post(
-        "http://localhost:9080/send-notification", json={"no-op": None}
+def send_notification(notification):
+    result = service_session().post(
+        TEST_SERVICE_URL + "/send-notification", json=notification
     )
     assert result.ok
 
 
-def test_set_action_reply_service_ready():
-    result = requests.post(
-        "http://localhost:9080/set-action-reply", json={"no-op": None}
+def send_notifications(notifications, interval_us=0, batch_size=1000):
+    """
+    Sends many notifications with one request per batch_size of them,
+    interval_us apart if given. Returns the number sent and failed and the
+    time the test-service spent sending, summed over the batches.
+    """
+    totals = {"sent": 0, "failed": 0, "elapsed-us": 0}
+    batch = []
+
+    def post():
+        result = service_session().post(
+            TEST_SERVICE_URL + "/send-notifications",
+            params={"interval-us": interval_us},
+            data="\n".join(batch).encode("utf-8"),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert result.ok, result.text
+        for key, value in result.json().items():
+            totals[key] += value
+        del batch[:]
+
+    for notification in notifications:
+        batch.append(json.dumps(notification))
+        if len(batch) == batch_size:
+            post()
+    if batch:
+        post()
+    return totals
+
+
+def set_action_reply(action):
+    result = service_session().post(
+        TEST_SERVICE_URL + "/set-action-reply", json=action
     )
     assert result.ok
 
 
-def find_single_xpath(data_xml, xpath):
-    doc = etree.fromstring(data_xml.encode("utf-8"))
-    results = doc.xpath(xpath, namespaces=NS_MAP)
+@functools.lru_cache(maxsize=None)
+def compiled_xpath(xpath):
+    """Returns xpath compiled with the prefixes of NS_MAP, once per expression"""
+    return etree.XPath(xpath, namespaces=NS_MAP)
+
+
+def find_xpath(data, xpath):
+    """
+    Evaluates xpath on data, which is either an element like the data_ele
+    of a reply or an XML string that is parsed first. Relative paths start
+    at the element or at the root of the string (<data> for a data_xml).
+    """
+    if isinstance(data, str):
+        data = etree.fromstring(data.encode("utf-8"))
+    return compiled_xpath(xpath)(data)
+
+
+def find_single_xpath(data, xpath):
+    results = find_xpath(data, xpath)
     if len(results) > 0:
         return results[0].text
     else:
         return "Not Found"
 
 
-def get_test_notification_simple_string_from_data_xml(data_xml):
-    return find_single_xpath(
-        data_xml,
-        "/nc:data/test-notification:string-container/test-notification:simple-string",
-    )
+def read_path(mgr, path, source=None, select=None):
+    """
+    Reads only the nodes at path, a path relative to <data> with the
+    prefixes of NS_MAP like "sys:system/sys:contact", and returns them.
+    Without source they are read from the operational state with <get>,
+    otherwise from that datastore with <get-config>. The XPath filter sent
+    selects path, or select if given (e.g. an ancestor of nodes that may
+    not exist in the schema because of a disabled feature).
+    """
+    select = path if select is None else select
+    prefixes = set(re.findall(r"([A-Za-z_][\w.-]*):", select))
+    namespaces = {prefix: NS_MAP[prefix] for prefix in prefixes if prefix in NS_MAP}
+    spec = ("xpath", (namespaces, "/" + select))
+    if source is None:
+        reply = mgr.get(filter=spec)
+    else:
+        reply = mgr.get_config(source=source, filter=spec)
+    return find_xpath(reply.data_ele, path)
+
+
+def read_leaf(mgr, path, source=None, select=None):
+    """Reads the leaf at path like read_path(), returns its value or "Not Found"."""
+    results = read_path(mgr, path, source, select)
+    if len(results) > 0:
+        return results[0].text
+    else:
+        return "Not Found"
 
 
 def get_test_notification_simple_string(mgr):
-    return get_test_notification_simple_string_from_data_xml(mgr.get().data_xml)
+    return read_leaf(
+        mgr, "test-notification:string-container/test-notification:simple-string"
+    )
 
 
 def get_test_notification_container_notification_string(mgr):
-    return find_single_xpath(
-        mgr.get().data_xml,
+    return read_leaf(
+        mgr,
         (
-            "/nc:data/test-notification:notification-from-container"
+            "test-notification:notification-from-container"
             "/test-notification:notification-string"
         ),
     )
 
 
 def get_notification_list(mgr):
-    data_xml = mgr.get().data_xml
-    doc = etree.fromstring(data_xml.encode("utf-8"))
-    results = doc.xpath(
+    results = read_path(
+        mgr,
         (
-            "/nc:data/test-notification:notification-from-list"
+            "test-notification:notification-from-list"
             "/test-notification:notification-from-list"
         ),
-        namespaces=NS_MAP,
     )
 
     ret = {}
@@ -233,14 +382,12 @@ def get_notification_list(mgr):
 
 
 def get_embedded_list(mgr):
-    data_xml = mgr.get().data_xml
-    doc = etree.fromstring(data_xml.encode("utf-8"))
-    results = doc.xpath(
+    results = read_path(
+        mgr,
         (
-            "/nc:data/test-notification:notification-from-list"
+            "test-notification:notification-from-list"
             "/test-notification:notification-from-list"
         ),
-        namespaces=NS_MAP,
     )
 
     ret = {}
@@ -513,3 +660,11 @@ def disable_feature(module, feature):
     subprocess.check_call(process_args)
 
 
+def enable_replay(module):
+    process_args=['sysrepoctl', '-v', '4', '--change', module, '--replay', 'on']
+    subprocess.check_call(process_args)
+
+
+def disable_replay(module):
+    process_args=['sysrepoctl', '-v', '4', '--change', module, '--replay', 'off']
+    subprocess.check_call(process_args)
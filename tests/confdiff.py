@@ -0,0 +1,339 @@
+"""
+Key-aware comparison of configurations
+
+config_diff() joins the children of every element of two configurations by
+their identity: the tag, and the key values of list entries or the value of
+leaf-list entries. The result does not depend on the order in which the
+server returns siblings or list entries. Differences are reported per list
+entry, with the keys in the path, e.g.
+/ietf-interfaces:interfaces/interface[name='eth0']/enabled, and a changed
+order of user-ordered lists is reported too. Either side may be given as
+several configurations, e.g. a snippet and the startup config, which are
+merged.
+
+stream_diff() compares configurations too large to hold as trees. They are
+parsed with iterparse into their top level list entries and the leaves
+outside of lists, each canonicalized on its own into its path and the
+sorted (path, value) pairs of its leaves, and discarded right after. The
+entries are sorted by path in runs of bounded size, spilled to temporary
+files, and the sorted runs of both sides are merged and joined entry by
+entry. Memory is bounded by the run size and the largest list entry, and
+the differences are reported as the join proceeds. The order of user-ordered
+lists is not compared.
+"""
+import collections
+import heapq
+import io
+import itertools
+import json
+import re
+import tempfile
+
+from lxml import etree
+
+from yangkeys import load_list_keys
+
+# list entries sorted in memory before a run is spilled to a temporary file
+RUN_SIZE = 10000
+
+IDENTITY = re.compile(r"([A-Za-z_][\w.-]*):(\S+)$")
+
+
+def _events(source):
+    """
+    (event, element) pairs of source and whether the elements can be
+    discarded once they have been read
+    """
+    if isinstance(source, etree._ElementTree):
+        source = source.getroot()
+    if isinstance(source, etree._Element):
+        return etree.iterwalk(source, events=("start", "end")), False
+    if isinstance(source, str) and source.lstrip().startswith("<"):
+        source = source.encode("utf-8")
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return (
+        etree.iterparse(
+            source,
+            events=("start", "end"),
+            remove_blank_text=True,
+            remove_comments=True,
+            huge_tree=True,
+        ),
+        True,
+    )
+
+
+def _quote(value):
+    return '"{}"'.format(value) if "'" in value else "'{}'".format(value)
+
+
+def _step(tag, parent_namespace, schema):
+    """Name of tag in a path, prefixed by its module below other modules"""
+    namespace, _, name = tag[1:].rpartition("}")
+    if namespace == parent_namespace:
+        return name
+    return "{}:{}".format(schema.module(namespace) or namespace, name)
+
+
+def _canonical_value(element, schema):
+    value = (element.text or "").strip()
+    match = IDENTITY.match(value)
+    if match and match.group(1) in element.nsmap:
+        module = schema.module(element.nsmap[match.group(1)])
+        if module is not None:
+            value = "{}:{}".format(module, match.group(2))
+    return value
+
+
+def canonical_entries(source, schema=None):
+    """
+    Yields (path, leaves) for every top level list entry and every leaf
+    outside of lists below the root element of source, an element, an XML
+    document as str or bytes, a file name or a file. leaves are the sorted
+    (path relative to the entry, value) pairs of the leaves of a list
+    entry, or [("", value)] for a leaf. Attributes are ignored and
+    identityref prefixes are replaced by module names.
+    """
+    schema = schema if schema is not None else load_list_keys()
+    events, discard = _events(source)
+    # open elements below the root as [namespace, step, keys, key values,
+    # pairs held back], keys being None for anything but list entries
+    stack = []
+    open_lists = 0
+    depth = 0
+    for event, element in events:
+        if not isinstance(element.tag, str):
+            # comments and processing instructions of an element tree
+            continue
+        if event == "start":
+            depth += 1
+            if depth == 1:
+                continue
+            namespace = element.tag[1:].rpartition("}")[0]
+            name = _step(element.tag, stack[-1][0] if stack else None, schema)
+            keys = schema.keys(element.tag)
+            stack.append([namespace, name, keys, {}, []])
+            if keys is not None:
+                open_lists += 1
+            continue
+
+        depth -= 1
+        if depth == 0:
+            continue
+        namespace, step, keys, key_values, held = stack.pop()
+        if keys is not None:
+            open_lists -= 1
+        if len(element):
+            if keys:
+                step += "".join(
+                    "[{}={}]".format(k, _quote(key_values[k])) for k in keys if k in key_values
+                )
+            pairs = [(step + "/" + path, value) for path, value in held]
+        else:
+            value = _canonical_value(element, schema)
+            held = [("", value)]
+            pairs = [(step, value)]
+            if stack and stack[-1][2] and step in stack[-1][2]:
+                stack[-1][3][step] = value
+
+        if open_lists:
+            stack[-1][4].extend(pairs)
+        elif keys is not None or not len(element):
+            # the leaves of containers outside of lists went out already
+            path = "".join("/" + frame[1] for frame in stack) + "/" + step
+            yield path, sorted(held)
+
+        if discard:
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def _spill(run):
+    run.sort(key=_path)
+    f = tempfile.TemporaryFile("w+", encoding="utf-8")
+    for entry in run:
+        f.write(json.dumps(entry) + "\n")
+    f.seek(0)
+    return f
+
+
+def _read_run(f):
+    for line in f:
+        path, leaves = json.loads(line)
+        yield path, [tuple(leaf) for leaf in leaves]
+
+
+def _path(entry):
+    return entry[0]
+
+
+def _sorted_entries(sources, schema, run_size):
+    """
+    canonical_entries() of all sources sorted by path, with the entries of
+    the same path combined
+    """
+    if not isinstance(sources, (list, tuple)):
+        sources = [sources]
+    runs = []
+    run = []
+    try:
+        for source in sources:
+            for entry in canonical_entries(source, schema):
+                run.append(entry)
+                if len(run) >= run_size:
+                    runs.append(_spill(run))
+                    run = []
+        run.sort(key=_path)
+        merged = heapq.merge(*[_read_run(f) for f in runs], iter(run), key=_path)
+        for path, entries in itertools.groupby(merged, key=_path):
+            yield path, sorted(leaf for _, leaves in entries for leaf in leaves)
+    finally:
+        for f in runs:
+            f.close()
+
+
+def _entry_diff(path, left, right):
+    values = collections.OrderedDict()
+    for side, leaves in ((0, left), (1, right)):
+        for leaf_path, value in leaves:
+            values.setdefault(leaf_path, ([], []))[side].append(value)
+    for leaf_path, (left_values, right_values) in values.items():
+        if left_values == right_values:
+            continue
+        leaf_path = path + "/" + leaf_path if leaf_path else path
+        if left_values and right_values:
+            yield "element values differ: {}".format(leaf_path)
+            yield "    left:  {}".format(", ".join(left_values))
+            yield "    right: {}".format(", ".join(right_values))
+        else:
+            yield "{} only: {}".format("left " if left_values else "right", leaf_path)
+
+
+def stream_diff(left, right, schema=None, run_size=RUN_SIZE):
+    """
+    Yields the differences between the configurations left and right, each
+    a source of canonical_entries() or a list of them whose entries are
+    merged, in the message format of config_diff()
+    """
+    schema = schema if schema is not None else load_list_keys()
+    lefts = _sorted_entries(left, schema, run_size)
+    rights = _sorted_entries(right, schema, run_size)
+    l, r = next(lefts, None), next(rights, None)
+    while l is not None or r is not None:
+        if r is None or (l is not None and l[0] < r[0]):
+            yield "left  only: {}".format(l[0])
+            l = next(lefts, None)
+        elif l is None or r[0] < l[0]:
+            yield "right only: {}".format(r[0])
+            r = next(rights, None)
+        else:
+            yield from _entry_diff(l[0], l[1], r[1])
+            l, r = next(lefts, None), next(rights, None)
+
+
+def _roots(sources):
+    if not isinstance(sources, (list, tuple)):
+        sources = [sources]
+    roots = []
+    for source in sources:
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        if isinstance(source, bytes):
+            source = etree.fromstring(source)
+        if isinstance(source, etree._ElementTree):
+            source = source.getroot()
+        roots.append(source)
+    return roots
+
+
+def _index(elements, schema):
+    """
+    The children of elements grouped by identity, in document order.
+    Containers known to the schema are identified by their tag alone, so a
+    container split over several of the elements is merged. Lists without
+    keys and unknown elements that occur more than once below the same
+    element are told apart by their position there.
+    """
+    index = collections.OrderedDict()
+    for element in elements:
+        occurrences = collections.Counter()
+        for child in element:
+            if not isinstance(child.tag, str):
+                continue
+            keys = schema.keys(child.tag) if len(child) else None
+            if keys:
+                values = {
+                    c.tag.rpartition("}")[2]: _canonical_value(c, schema)
+                    for c in child
+                    if isinstance(c.tag, str) and c.tag.rpartition("}")[2] in keys
+                }
+                identity = (child.tag, tuple((k, values.get(k)) for k in keys))
+            elif not len(child) and schema.is_leaf_list(child.tag):
+                identity = (child.tag, ((".", _canonical_value(child, schema)),))
+            elif schema.is_container(child.tag):
+                identity = (child.tag, None)
+            else:
+                identity = (child.tag, occurrences[child.tag])
+                occurrences[child.tag] += 1
+            index.setdefault(identity, []).append(child)
+    return index
+
+
+def _identity_step(identity, parent_namespace, schema):
+    tag, detail = identity
+    step = _step(tag, parent_namespace, schema)
+    if isinstance(detail, tuple):
+        return step + "".join(
+            "[{}={}]".format(k, _quote(v)) for k, v in detail if v is not None
+        )
+    return step + "[{}]".format(detail + 1) if detail else step
+
+
+def _config_diff(left, right, path, schema, msgs):
+    namespace = left[0].tag[1:].rpartition("}")[0] if path else None
+    left_index = _index(left, schema)
+    right_index = _index(right, schema)
+
+    for identity, left_children in left_index.items():
+        child_path = path + "/" + _identity_step(identity, namespace, schema)
+        right_children = right_index.get(identity)
+        if right_children is None:
+            msgs.append("left  only: {}".format(child_path))
+        elif len(left_children[0]) or len(right_children[0]):
+            _config_diff(left_children, right_children, child_path, schema, msgs)
+        else:
+            left_value = _canonical_value(left_children[0], schema)
+            right_value = _canonical_value(right_children[0], schema)
+            if left_value != right_value:
+                msgs.append("element values differ: {}".format(child_path))
+                msgs.append("    left:  {}".format(left_value))
+                msgs.append("    right: {}".format(right_value))
+    for identity in right_index:
+        if identity not in left_index:
+            msgs.append(
+                "right only: {}".format(path + "/" + _identity_step(identity, namespace, schema))
+            )
+
+    ordered = collections.defaultdict(lambda: ([], []))
+    for order, index, other in ((0, left_index, right_index), (1, right_index, left_index)):
+        for identity in index:
+            if identity in other and schema.ordered_by_user(identity[0]):
+                ordered[identity[0]][order].append(identity)
+    for tag, (left_order, right_order) in ordered.items():
+        if left_order != right_order:
+            msgs.append("order differs: {}/{}".format(path, _step(tag, namespace, schema)))
+
+
+def config_diff(left, right, schema=None):
+    """
+    Compares the children of the root elements left and right, each an
+    element, element tree or XML document or a list of them whose children
+    are merged, and returns the differences in the message format of
+    common.etree_diff
+    """
+    msgs = []
+    schema = schema if schema is not None else load_list_keys()
+    _config_diff(_roots(left), _roots(right), "", schema, msgs)
+    return msgs
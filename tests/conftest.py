@@ -7,29 +7,288 @@ from common import (
     wait_for,
     connect_mgr,
     nacm_enable,
-    test_send_notification_service_ready,
-    test_set_action_reply_service_ready,
+    SessionPool,
+    NETCONF_PORT,
+    WORKER_INDEX,
 )
+from benchmark import NETOPEER2_PID_FILE, Baseline, BenchmarkRecorder, Trials, read_pid
+from readiness import test_service_ready, wait_for_file, wait_for_port
+from rpcphases import RpcPhases
+from sampler import ResourceSampler, find_pid
+from workers import WorkerStack
+
+SUPERVISORD_PID_FILE = "/var/run/supervisord.pid"
+
+
+def pytest_configure(config):
+    # the controller of pytest-xdist workers, which record into the same files
+    if getattr(config.option, "numprocesses", None) and not hasattr(config, "workerinput"):
+        BenchmarkRecorder().clear()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("benchmark")
+    group.addoption(
+        "--bench-warmup",
+        type=int,
+        default=1,
+        help="unmeasured iterations before each benchmark (default: 1)",
+    )
+    group.addoption(
+        "--bench-repeat",
+        type=int,
+        default=3,
+        help="measured repetitions of each benchmark (default: 3)",
+    )
+    group.addoption(
+        "--bench-baseline",
+        default=None,
+        metavar="PATH",
+        help="benchmark.jsonl of an earlier run to check for regressions",
+    )
+    group.addoption(
+        "--bench-threshold",
+        type=float,
+        default=0.2,
+        help="tolerated slowdown against the baseline (default: 0.2 = 20%%)",
+    )
+    group.addoption(
+        "--bench-notifications",
+        type=int,
+        default=1000,
+        help="notifications sent by each notification benchmark (default: 1000)",
+    )
+    group.addoption(
+        "--bench-replay-volume",
+        type=int,
+        default=10000,
+        help="notifications stored for the replay benchmark (default: 10000)",
+    )
+    group.addoption(
+        "--sample-resources",
+        choices=["off", "test", "session"],
+        default="off",
+        help="sample the resource usage of the stack during every long "
+        "running test or during the whole session (default: off)",
+    )
+    group.addoption(
+        "--sample-interval",
+        type=float,
+        default=0.5,
+        help="seconds between two resource samples (default: 0.5)",
+    )
+    group.addoption(
+        "--soak-iterations",
+        type=int,
+        default=0,
+        help="create/delete cycles of the soak test, 0 for no limit (default: 0)",
+    )
+    group.addoption(
+        "--soak-duration",
+        type=float,
+        default=0,
+        help="seconds the soak test runs, 0 for no limit (default: 0); "
+        "the soak test is skipped unless this or --soak-iterations is given",
+    )
+    group.addoption(
+        "--soak-vlans",
+        type=int,
+        default=100,
+        help="VLANs created and deleted by each soak cycle (default: 100)",
+    )
+    group.addoption(
+        "--soak-max-rss-slope",
+        type=float,
+        default=1024,
+        help="tolerated growth of netopeer2-server's RSS in kB per 100 soak "
+        "cycles (default: 1024)",
+    )
+    group.addoption(
+        "--soak-max-shm-slope",
+        type=float,
+        default=1024,
+        help="tolerated growth of sysrepo's SHM in kB per 100 soak cycles "
+        "(default: 1024)",
+    )
+    group.addoption(
+        "--soak-max-latency-slope",
+        type=float,
+        default=0.05,
+        help="tolerated growth of the cycle latency per 100 soak cycles, "
+        "relative to the first cycles (default: 0.05 = 5%%)",
+    )
+    group.addoption(
+        "--bench-framing-max-size",
+        type=int,
+        default=100000000,
+        help="largest payload in bytes sent by the framing benchmark "
+        "(default: 100000000)",
+    )
+    group.addoption(
+        "--bench-regression",
+        choices=["fail", "xfail"],
+        default="fail",
+        help="outcome of a test exceeding the threshold (default: fail)",
+    )
+
 
 @pytest.fixture(scope="session")
-def nacm_off():
+def worker_stack():
+    """The isolated stack of a pytest-xdist worker, None for the default stack"""
+    if not WORKER_INDEX:
+        yield None
+        return
+
+    stack = WorkerStack(WORKER_INDEX)
+    stack.prepare()
+    yield stack
+    stack.stop()
+
+
+@pytest.fixture(scope="session")
+def nacm_off(worker_stack):
     nacm_enable(False)
 
 
 @pytest.fixture(scope="session")
-def services(nacm_off):
+def services(nacm_off, worker_stack):
     """Start the services"""
-    if not os.path.isfile("/var/run/supervisord.pid"):
+    if worker_stack is not None:
+        worker_stack.start()
+    elif not os.path.isfile(SUPERVISORD_PID_FILE):
         subprocess.check_call("echo root:password | chpasswd", shell=True)
         subprocess.check_call("supervisord")
 
-    wait_for(connect_mgr, timeout=20, period=0.5).close_session()
-    wait_for(test_send_notification_service_ready, timeout=60, period=0.5)
-    wait_for(test_set_action_reply_service_ready, timeout=60, period=0.5)
+    pid_file = worker_stack.pid_file if worker_stack else NETOPEER2_PID_FILE
+    assert wait_for_file(pid_file, timeout=100), "netopeer2-server did not start"
+    wait_for_port(NETCONF_PORT, timeout=20)
+    wait_for(connect_mgr, timeout=20, period=0.05, backoff=2, max_period=0.5).close_session()
+    wait_for(test_service_ready, timeout=60, period=0.01, backoff=2, max_period=0.5)
+
+
+@pytest.fixture(scope="session")
+def stack_pids(services, worker_stack):
+    """pids of the processes of the stack the tests run against"""
+    if worker_stack is not None:
+        return dict(worker_stack.pids)
+    # the test-services of the workers are children of the pytest workers
+    return {
+        "netopeer2-server": read_pid(NETOPEER2_PID_FILE),
+        "test-service": find_pid("test-service", parent=read_pid(SUPERVISORD_PID_FILE)),
+    }
+
+
+@pytest.fixture(scope="session", autouse=True)
+def session_resources(request):
+    """Samples the resource usage during the session with --sample-resources=session"""
+    if request.config.getoption("--sample-resources") != "session":
+        yield None
+        return
+    pids = request.getfixturevalue("stack_pids")
+    recorder = request.getfixturevalue("bench_recorder")
+    with ResourceSampler(pids, request.config.getoption("--sample-interval")) as sampler:
+        yield sampler
+    recorder.record_entry(request, "resources", **sampler.timeseries())
+
+
+@pytest.fixture()
+def resource_sampler(request, stack_pids, bench_recorder):
+    """Samples the resource usage while the test runs and records it"""
+    with ResourceSampler(stack_pids, request.config.getoption("--sample-interval")) as sampler:
+        yield sampler
+    bench_recorder.record_entry(request, "resources", **sampler.timeseries())
+
+
+@pytest.fixture(autouse=True)
+def sample_long_runners(request):
+    """Samples every long running test with --sample-resources=test"""
+    if (
+        request.config.getoption("--sample-resources") == "test"
+        and request.node.get_closest_marker("long_runner") is not None
+    ):
+        request.getfixturevalue("resource_sampler")
+    yield
+
+
+@pytest.fixture(scope="session")
+def session_pool(services):
+    pool = SessionPool()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture()
+def mgr(request, session_pool):
+    """
+    Connect to the NETCONF server. Sessions are reused by later tests unless
+    the test is marked exclusive_session.
+    """
+    session = session_pool.acquire()
+    yield session
+    exclusive = request.node.get_closest_marker("exclusive_session") is not None
+    session_pool.release(session, reuse=not exclusive)
+
+
+@pytest.fixture()
+def rpc_phases(mgr):
+    """Timestamps the client and server side phases of RPCs sent on mgr"""
+    phases = RpcPhases().attach(mgr)
+    yield phases
+    phases.detach()
+
+
+@pytest.fixture(scope="session")
+def bench_recorder(request):
+    """
+    Structured benchmark results, written fresh for every session. Under
+    pytest-xdist the workers share the files, which the controller clears
+    in pytest_configure instead.
+    """
+    recorder = BenchmarkRecorder()
+    if not hasattr(request.config, "workerinput"):
+        recorder.clear()
+    return recorder
+
+
+@pytest.fixture()
+def bench_trials(request, stack_pids):
+    """Warmup and repetitions for a benchmark as given on the command line"""
+    return Trials(
+        warmup=request.config.getoption("--bench-warmup"),
+        repeat=request.config.getoption("--bench-repeat"),
+        pid=stack_pids["netopeer2-server"],
+    )
+
+
+@pytest.fixture()
+def bench_notifications(request):
+    return request.config.getoption("--bench-notifications")
+
+
+@pytest.fixture(scope="session")
+def bench_baseline(request):
+    path = request.config.getoption("--bench-baseline")
+    return Baseline(path) if path else None
+
 
 @pytest.fixture()
-def mgr(services):
-    """Connect to the NETCONF server"""
-    return connect_mgr()
+def bench_gate(request, bench_baseline):
+    """Fails (or xfails) the test if recorded entries regressed against the baseline"""
+    threshold = request.config.getoption("--bench-threshold")
+    outcome = request.config.getoption("--bench-regression")
 
+    def check(*entries):
+        if bench_baseline is None:
+            return
+        messages = bench_baseline.regressions(entries, threshold)
+        if not messages:
+            return
+        report = "regression against {}:\n{}".format(
+            bench_baseline.path, "\n".join(messages)
+        )
+        if outcome == "xfail":
+            pytest.xfail(report)
+        else:
+            pytest.fail(report)
 
+    return check
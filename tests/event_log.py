@@ -1,32 +1,100 @@
-import yaml
+"""
+Client for the sysrepo change events recorded by the test-service
 
-PATH = "/tmp/test-service-event-stream.yml"
+The test-service keeps the recent change events in memory, indexed by
+operation and path, and serves them over HTTP. EventLog asks it only for the events
+added since the ones it already looked at, letting the service filter by
+event type and path prefix and block until a matching event arrives, so a
+check neither rereads a log file nor sleeps before looking.
 
+The service additionally appends all events to PATH as JSON lines, which
+is kept as a trace for debugging failed runs.
+"""
+import time
 
-def clear():
-    with open(PATH, "w"):
-        pass
+from common import TEST_SERVICE_URL, WORKER_INDEX, service_session
 
+if WORKER_INDEX:
+    PATH = "/tmp/test-service-event-stream-gw{}.jsonl".format(WORKER_INDEX)
+else:
+    PATH = "/tmp/test-service-event-stream.jsonl"
 
-def load():
-    with open(PATH, "r") as f:
-        return list(yaml.load_all(f))
+PATH_KEYS = ["new-path", "old-path"]
+
+
+class EventLog:
+    def __init__(self, url=TEST_SERVICE_URL + "/events"):
+        self.url = url
+        self.since = 0
+
+    def clear(self):
+        """Drops all recorded events"""
+        result = service_session().delete(self.url)
+        assert result.ok
+        self.since = result.json()["next"]
+
+    def query(self, since=None, wait=0, **params):
+        """
+        Returns the events after since, keeping only the values matching
+        params (event-type, op, path-prefix), and the sequence number to
+        continue from. With wait the service waits that many seconds for a
+        matching event to arrive.
+        """
+        params["since"] = self.since if since is None else since
+        params["wait-ms"] = int(wait * 1000)
+        result = service_session().get(self.url, params=params)
+        assert result.ok, result.text
+        body = result.json()
+        return body["events"], body["next"]
+
+    def retention(self):
+        """
+        Returns the sequence number of the oldest event the service still
+        keeps and the number of changes it keeps at most
+        """
+        body = service_session().get(self.url, params={"since": self.since}).json()
+        return body["first"], body["limit"]
 
+    def load(self):
+        """Returns all events recorded since the last clear"""
+        events, _ = self.query()
+        return events
 
-def find_change_in_log(log, event_type, search_for):
-    for event in log:
-        if event["event_type"] != event_type:
-            continue
+    def find(self, event_type, search_for, timeout=5):
+        """
+        Returns the first event of event_type with a value matching all
+        items of search_for, or None if none arrived within timeout
+        """
+        params = {"event-type": event_type}
+        path_keys = [key for key in PATH_KEYS if key in search_for]
+        if path_keys:
+            params["path-prefix"] = search_for[path_keys[0]]
+        elif "operation" in search_for:
+            params["op"] = search_for["operation"]
 
-        for value in event["values"]:
-            missing_key = False
+        since = self.since
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = max(deadline - time.monotonic(), 0)
+            events, since = self.query(since, wait=remaining, **params)
+            for event in events:
+                for value in event["values"]:
+                    if all(value.get(key) == expected for key, expected in search_for.items()):
+                        return event
+            if remaining == 0:
+                return None
 
-            for key in search_for.keys():
-                if value[key] != search_for[key]:
-                    missing_key = True
-                    break
 
-            if not missing_key:
-                return event
+_log = EventLog()
+
+
+def clear():
+    _log.clear()
+
+
+def load():
+    return _log.load()
+
 
-    return None
+def find_change(event_type, search_for):
+    return _log.find(event_type, search_for)
@@ -0,0 +1,92 @@
+"""
+Load generator driving several NETCONF sessions in parallel
+
+Every task runs in its own thread on its own session. All sessions are
+connected before the first request is sent, so the measured interval only
+covers the interleaved requests and not the SSH handshakes.
+"""
+import threading
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import latency_histogram, summarize
+
+
+class SessionStats:
+    """Latencies of the operations issued by one session"""
+
+    def __init__(self, index):
+        self.index = index
+        self.latencies = defaultdict(list)
+        self.errors = []
+        self.start = None
+        self.stop = None
+
+    def timed(self, operation, f, *args, **kwargs):
+        """Calls f and records its latency under the name operation"""
+        start = time.monotonic()
+        try:
+            return f(*args, **kwargs)
+        except Exception as e:
+            self.errors.append("session {} {}: {}".format(self.index, operation, e))
+        finally:
+            self.latencies[operation].append(time.monotonic() - start)
+
+    def latency_summary(self):
+        return {op: summarize(samples) for op, samples in self.latencies.items()}
+
+    def histograms(self):
+        return {op: latency_histogram(samples) for op, samples in self.latencies.items()}
+
+
+class LoadResult:
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.wall = max(s.stop for s in sessions) - min(s.start for s in sessions)
+        self.operations = sum(
+            len(samples) for s in sessions for samples in s.latencies.values()
+        )
+        self.throughput = self.operations / self.wall if self.wall else 0.0
+        self.errors = [e for s in sessions for e in s.errors]
+
+    def latency_summary(self):
+        """Latency statistics per operation over all sessions"""
+        merged = defaultdict(list)
+        for s in self.sessions:
+            for op, samples in s.latencies.items():
+                merged[op].extend(samples)
+        return {op: summarize(samples) for op, samples in merged.items()}
+
+
+def run_sessions(connect, tasks):
+    """
+    Runs every task(mgr, stats) on its own session created by connect() and
+    returns a LoadResult once all of them finished
+    """
+    barrier = threading.Barrier(len(tasks))
+
+    def worker(index, task):
+        stats = SessionStats(index)
+        try:
+            mgr = connect()
+        except Exception:
+            # release the sessions already waiting for this one
+            barrier.abort()
+            raise
+        try:
+            barrier.wait()
+            stats.start = time.monotonic()
+            try:
+                task(mgr, stats)
+            except Exception:
+                stats.errors.append(traceback.format_exc())
+            stats.stop = time.monotonic()
+        finally:
+            mgr.close_session()
+        return stats
+
+    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        futures = [pool.submit(worker, i, task) for i, task in enumerate(tasks)]
+        return LoadResult([f.result() for f in futures])
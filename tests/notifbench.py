@@ -0,0 +1,276 @@
+"""
+Delivery measurements for notifications sent through the test-service
+
+Every notification carries its sequence number as new-value and is stamped
+by sysrepo with the time it was sent (eventTime). A NotificationCollector
+attached to a subscriber's session notes the arrival time of each message
+as soon as ncclient has read it, so the difference between the two is the
+delivery latency through sysrepo and netopeer2, and gaps in the sequence
+numbers are notifications that never arrived.
+"""
+import calendar
+import contextlib
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lxml import etree
+from ncclient.transport.session import SessionListener
+from ncclient.xml_ import to_ele
+
+from benchmark import latency_histogram, summarize
+from common import connect_mgr, send_notifications
+
+NOTIFICATION_NS = "urn:ietf:params:xml:ns:netconf:notification:1.0"
+NETMOD_NOTIFICATION_NS = "urn:ietf:params:xml:ns:netmod:notification"
+TEST_NOTIFICATIONS_NS = "http://www.example.com/ns/yang/test-notifications"
+
+LIST_KEY = "bench"
+LIST_KEYS = [LIST_KEY, "bench2"]
+
+# test-service xpaths of the notifications of test-notifications.yang
+NOTIFICATIONS = {
+    "simple": "/test-notifications:string-container-simple-string-changed",
+    "container": (
+        "/test-notifications:notification-from-container"
+        "/test-notifications:container-notification-string-changed"
+    ),
+    "list": (
+        "/test-notifications:notification-from-list"
+        "/test-notifications:notification-from-list[name='{key}']"
+        "/test-notifications:list-foo-changed"
+    ),
+}
+
+# subtree filters selecting one kind of notification, list-key only those
+# of one list entry
+FILTERS = {
+    "simple": '<string-container-simple-string-changed xmlns="{ns}"/>',
+    "container": (
+        '<notification-from-container xmlns="{ns}">'
+        "<container-notification-string-changed/>"
+        "</notification-from-container>"
+    ),
+    "list": (
+        '<notification-from-list xmlns="{ns}">'
+        "<notification-from-list><list-foo-changed/></notification-from-list>"
+        "</notification-from-list>"
+    ),
+    "list-key": (
+        '<notification-from-list xmlns="{ns}">'
+        "<notification-from-list><name>{key}</name><list-foo-changed/>"
+        "</notification-from-list></notification-from-list>"
+    ),
+}
+
+# the kinds and list keys a mixed stream of notifications cycles through
+MIXED = [
+    ("simple", None),
+    ("container", None),
+    ("list", LIST_KEYS[0]),
+    ("list", LIST_KEYS[1]),
+]
+
+# subscriptions of the fan-out test as (name, filter, selects(kind, key))
+FANOUT_SUBSCRIPTIONS = [
+    ("unfiltered", None, lambda kind, key: True),
+    ("simple", "simple", lambda kind, key: kind == "simple"),
+    ("container", "container", lambda kind, key: kind == "container"),
+    ("list", "list", lambda kind, key: kind == "list"),
+    ("list-key", "list-key", lambda kind, key: key == LIST_KEY),
+]
+
+EVENT_TIME = re.compile(
+    r"(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)$"
+)
+
+
+def notification(kind, seq, key=LIST_KEY):
+    """The test-service request for notification number seq of kind"""
+    xpath = NOTIFICATIONS[kind].format(key=key)
+    return {
+        "xpath": xpath,
+        "values": [
+            {"xpath": xpath + "/test-notifications:new-value", "value": str(seq)}
+        ],
+    }
+
+
+def subtree_filter(kind, key=LIST_KEY):
+    return FILTERS[kind].format(ns=TEST_NOTIFICATIONS_NS, key=key)
+
+
+def mixed_schedule(count):
+    """(seq, kind, key) of count notifications cycling through MIXED"""
+    return [(seq,) + MIXED[seq % len(MIXED)] for seq in range(count)]
+
+
+def subscribe(mgr, filter_xml=None, start_time=None, stop_time=None):
+    """
+    Sends create-subscription, with filter_xml as subtree filter if given.
+    start_time and stop_time (seconds since the epoch) request a replay of
+    the stored notifications.
+    """
+    subscription = '<create-subscription xmlns="{}">'.format(NOTIFICATION_NS)
+    if filter_xml is not None:
+        subscription += '<filter type="subtree">{}</filter>'.format(filter_xml)
+    if start_time is not None:
+        subscription += "<startTime>{}</startTime>".format(format_event_time(start_time))
+    if stop_time is not None:
+        subscription += "<stopTime>{}</stopTime>".format(format_event_time(stop_time))
+    subscription += "</create-subscription>"
+    mgr.dispatch(to_ele(subscription))
+
+
+@contextlib.contextmanager
+def open_sessions(count, max_parallel=16):
+    """Opens count extra NETCONF sessions, connecting several at a time"""
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        futures = [pool.submit(connect_mgr) for _ in range(count)]
+    sessions = [f.result() for f in futures if f.exception() is None]
+    errors = [f.exception() for f in futures if f.exception() is not None]
+    try:
+        if errors:
+            raise errors[0]
+        yield sessions
+    finally:
+        for session in sessions:
+            session.close_session()
+
+
+def inject(kind, count, interval_us=0, first=0, key=LIST_KEY):
+    """Sends count notifications of kind numbered from first on"""
+    return send_notifications(
+        (notification(kind, seq, key) for seq in range(first, first + count)),
+        interval_us=interval_us,
+    )
+
+
+def inject_schedule(schedule, interval_us=0):
+    """Sends the notifications of a mixed_schedule()"""
+    return send_notifications(
+        (notification(kind, seq, key) for seq, kind, key in schedule),
+        interval_us=interval_us,
+    )
+
+
+def format_event_time(seconds):
+    """Converts seconds since the epoch to an RFC 3339 date-and-time"""
+    whole, micro = divmod(int(round(seconds * 1e6)), 1000000)
+    return "{}.{:06d}Z".format(
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(whole)), micro
+    )
+
+
+def parse_event_time(text):
+    """Converts an RFC 3339 date-and-time to seconds since the epoch"""
+    match = EVENT_TIME.match(text.strip())
+    if match is None:
+        raise ValueError("invalid eventTime " + text)
+    fields = [int(f) for f in match.groups()[:6]]
+    seconds = calendar.timegm(fields)
+    fraction, offset = match.group(7), match.group(8)
+    if fraction:
+        seconds += int(fraction) / 10 ** len(fraction)
+    if offset != "Z":
+        sign = 1 if offset[0] == "+" else -1
+        seconds -= sign * (int(offset[1:3]) * 3600 + int(offset[4:6]) * 60)
+    return seconds
+
+
+class Delivery:
+    def __init__(self, seq, event_time, arrival):
+        self.seq = seq
+        self.event_time = event_time
+        self.arrival = arrival
+
+    @property
+    def latency(self):
+        return self.arrival - self.event_time
+
+
+class NotificationCollector(SessionListener):
+    """
+    Notes the arrival of the test notifications on one session. Messages
+    are only timestamped here, they are parsed after the run so that the
+    listener does not slow down ncclient's reader thread.
+    """
+
+    def __init__(self):
+        self.arrivals = []
+        self.errors = []
+        self.replay_complete = None
+        self._condition = threading.Condition()
+
+    def attach(self, mgr):
+        mgr._session.add_listener(self)
+        return self
+
+    def callback(self, root, raw):
+        arrival = time.time()
+        # cheap checks, the payload is parsed later
+        if TEST_NOTIFICATIONS_NS in raw:
+            with self._condition:
+                self.arrivals.append((arrival, raw))
+                self._condition.notify_all()
+        elif "replayComplete" in raw and NETMOD_NOTIFICATION_NS in raw:
+            with self._condition:
+                self.replay_complete = arrival
+                self._condition.notify_all()
+
+    def errback(self, ex):
+        self.errors.append(str(ex))
+
+    def wait(self, count, timeout):
+        """Waits until count test notifications arrived, False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: len(self.arrivals) >= count, timeout
+            )
+
+    def wait_replay_complete(self, timeout):
+        """Waits for the replayComplete notification, False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self.replay_complete is not None, timeout
+            )
+
+    def deliveries(self):
+        result = []
+        for arrival, raw in self.arrivals:
+            ele = etree.fromstring(raw.encode("utf-8"))
+            event_time = ele.findtext("{%s}eventTime" % NOTIFICATION_NS)
+            value = ele.find(".//{%s}new-value" % TEST_NOTIFICATIONS_NS)
+            if event_time is None or value is None:
+                continue
+            result.append(Delivery(int(value.text), parse_event_time(event_time), arrival))
+        return result
+
+
+def delivery_stats(deliveries, expected, late_after=None):
+    """
+    Summarizes the deliveries of one subscriber which should have received
+    the sequence numbers in expected. Deliveries taking longer than
+    late_after seconds are counted as late.
+    """
+    latencies = [d.latency for d in deliveries]
+    seqs = [d.seq for d in deliveries]
+    received = set(seqs) & set(expected)
+    arrivals = [d.arrival for d in deliveries]
+    duration = max(arrivals) - min(arrivals) if len(arrivals) > 1 else 0.0
+    return {
+        "expected": len(expected),
+        "received": len(received),
+        "dropped": len(expected) - len(received),
+        "duplicates": len(seqs) - len(set(seqs)),
+        "reordered": sum(1 for a, b in zip(seqs, seqs[1:]) if b < a),
+        "late": (
+            sum(1 for latency in latencies if latency > late_after)
+            if late_after is not None
+            else None
+        ),
+        "throughput": len(deliveries) / duration if duration else 0.0,
+        "latency": summarize(latencies) if latencies else None,
+        "histogram": latency_histogram(latencies),
+    }
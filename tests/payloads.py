@@ -0,0 +1,297 @@
+"""
+edit-config payloads of the scale tests
+
+Every list entry is an XML fragment parsed once into a Template and then
+instantiated for each VLAN instead of formatting and parsing the text of the
+whole payload. The builders return the <nc:config> element, which ncclient
+sends without parsing it again. A payload of 10000 VLANs still takes about
+a second to build, which is why the scale tests build their payloads before
+the measured phases.
+
+All namespaces are declared once on <nc:config> and the entries are built in
+place below it. Moving a tree into another document, as ncclient does with
+the config when it builds the <rpc>, takes time quadratic in the number of
+namespace declarations in the tree, which made a 10000 VLAN payload take
+several more seconds before it was even sent.
+"""
+from lxml import etree
+
+NC_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+IF_NS = "urn:ietf:params:xml:ns:yang:ietf-interfaces"
+L2_FORWARDING_NS = "urn:bbf:yang:bbf-l2-forwarding"
+
+# every namespace of the templates, identityref values use these prefixes
+NSMAP = {
+    "nc": NC_NS,
+    "if": IF_NS,
+    "ianaift": "urn:ietf:params:xml:ns:yang:iana-if-type",
+    "ift": "urn:bbf:yang:bbf-if-type",
+    "bbf-subif": "urn:bbf:yang:bbf-sub-interfaces",
+    "bbf-subif-tag": "urn:bbf:yang:bbf-sub-interface-tagging",
+    "q": "urn:bbf:yang:bbf-dot1q-types",
+    "bbf-l2-fwd": L2_FORWARDING_NS,
+}
+
+FORWARDING_DATABASE = "FDB1"
+
+PARSER = etree.XMLParser(remove_blank_text=True)
+
+
+class Template:
+    """
+    An XML fragment whose element texts may contain str.format fields,
+    e.g. <name>{interface}.{vlanid}</name>. add() builds it below a parent
+    whose ancestors declare the namespaces in NSMAP.
+    """
+
+    def __init__(self, xml):
+        self.element = etree.fromstring(xml, PARSER)
+        # (depth, tag, attributes, text) of the elements in document order
+        self.nodes = []
+        for element in self.element.iter():
+            depth = sum(1 for _ in element.iterancestors())
+            self.nodes.append((depth, element.tag, dict(element.attrib), element.text))
+
+    def add(self, parent, **values):
+        path = [parent]
+        for depth, tag, attrib, text in self.nodes:
+            element = etree.SubElement(path[depth], tag, attrib)
+            if text is not None:
+                element.text = text.format(**values) if "{" in text else text
+            del path[depth + 1:]
+            path.append(element)
+        return path[1]
+
+
+FORWARDING_DATABASES = Template(
+    f"""
+    <forwarding-databases xmlns="{L2_FORWARDING_NS}" xmlns:nc="{NC_NS}">
+      <forwarding-database nc:operation="merge">
+        <name>{{database}}</name>
+      </forwarding-database>
+    </forwarding-databases>"""
+)
+
+INTERFACE_BASE = Template(
+    f"""
+    <interface xmlns="{IF_NS}">
+      <name>{{interface}}</name>
+      <enabled>true</enabled>
+      <type xmlns:ianaift="urn:ietf:params:xml:ns:yang:iana-if-type">ianaift:ethernetCsmacd</type>
+    </interface>"""
+)
+
+VLAN_SUBINTERFACE_SINGLE_TAGGED = Template(
+    f"""
+    <interface xmlns="{IF_NS}" xmlns:nc="{NC_NS}" nc:operation="create">
+      <name>{{interface}}.{{vlanid}}</name>
+      <type xmlns:ift="urn:bbf:yang:bbf-if-type">ift:vlan-sub-interface</type>
+      <enabled>true</enabled>
+      <subif-lower-layer xmlns="urn:bbf:yang:bbf-sub-interfaces">
+        <interface>{{interface}}</interface>
+      </subif-lower-layer>
+      <inline-frame-processing xmlns="urn:bbf:yang:bbf-sub-interfaces">
+        <ingress-rule>
+          <rule>
+            <name>1</name>
+            <priority>1</priority>
+            <flexible-match>
+              <match-criteria xmlns="urn:bbf:yang:bbf-sub-interface-tagging">
+                <tag>
+                  <index>0</index>
+                  <dot1q-tag>
+                    <tag-type xmlns:q="urn:bbf:yang:bbf-dot1q-types">q:s-vlan</tag-type>
+                    <vlan-id>{{vlanid}}</vlan-id>
+                  </dot1q-tag>
+                </tag>
+              </match-criteria>
+            </flexible-match>
+          </rule>
+        </ingress-rule>
+      </inline-frame-processing>
+    </interface>"""
+)
+
+DELETE_INTERFACE = Template(
+    f"""
+    <interface xmlns="{IF_NS}" xmlns:nc="{NC_NS}" nc:operation="remove">
+      <name>{{interface}}</name>
+    </interface>"""
+)
+
+FORWARDER = Template(
+    f"""
+    <forwarder xmlns="{L2_FORWARDING_NS}" xmlns:nc="{NC_NS}" nc:operation="create">
+      <name>fwd-{{subif1}}-{{subif2}}</name>
+      <ports>
+        <port>
+          <name>{{subif1}}</name>
+          <sub-interface>{{subif1}}</sub-interface>
+        </port>
+        <port>
+          <name>{{subif2}}</name>
+          <sub-interface>{{subif2}}</sub-interface>
+        </port>
+      </ports>
+      <mac-learning>
+        <forwarding-database>{{database}}</forwarding-database>
+      </mac-learning>
+    </forwarder>"""
+)
+
+DELETE_FORWARDER = Template(
+    f"""
+    <forwarder xmlns="{L2_FORWARDING_NS}" xmlns:nc="{NC_NS}" nc:operation="remove">
+      <name>fwd-{{subif1}}-{{subif2}}</name>
+    </forwarder>"""
+)
+
+
+def config():
+    """The <nc:config> element of an edit-config"""
+    return etree.Element(f"{{{NC_NS}}}config", nsmap=NSMAP)
+
+
+def container(parent, namespace, name, entries=()):
+    """Adds the container with the (template, values) entries to parent"""
+    element = etree.SubElement(parent, f"{{{namespace}}}{name}")
+    for template, values in entries:
+        template.add(element, **values)
+    return element
+
+
+class _ByteCounter:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+
+
+def payload_size(config):
+    """Size of the serialized config in bytes, counted as it is written out"""
+    counter = _ByteCounter()
+    etree.ElementTree(config).write(counter)
+    return counter.size
+
+
+###############################################################################
+# list entries as (template, values)
+###############################################################################
+
+
+def interfaces_base(ifaces):
+    for iface in ifaces:
+        yield INTERFACE_BASE, {"interface": iface}
+
+
+def delete_interfaces(ifaces):
+    for iface in ifaces:
+        yield DELETE_INTERFACE, {"interface": iface}
+
+
+def vlan_subinterfaces_single_tagged(if1, if2, vlanids):
+    """The sub-interfaces of all vlanids on if1, then those on if2"""
+    for interface in (if1, if2):
+        for vlanid in vlanids:
+            yield VLAN_SUBINTERFACE_SINGLE_TAGGED, {"interface": interface, "vlanid": vlanid}
+
+
+def delete_vlan_subinterfaces_single_tagged(if1, if2, vlanids):
+    for interface in (if1, if2):
+        for vlanid in vlanids:
+            yield DELETE_INTERFACE, {"interface": f"{interface}.{vlanid}"}
+
+
+def forwarders(if1, if2, vlanids, database=FORWARDING_DATABASE):
+    """A forwarder between the sub-interfaces of if1 and if2 per VLAN"""
+    for vlanid in vlanids:
+        yield FORWARDER, {
+            "subif1": f"{if1}.{vlanid}",
+            "subif2": f"{if2}.{vlanid}",
+            "database": database,
+        }
+
+
+def delete_forwarders(if1, if2, vlanids):
+    for vlanid in vlanids:
+        yield DELETE_FORWARDER, {"subif1": f"{if1}.{vlanid}", "subif2": f"{if2}.{vlanid}"}
+
+
+###############################################################################
+# payloads
+###############################################################################
+
+
+def bulk_create_interfaces_base(ifaces):
+    root = config()
+    container(root, IF_NS, "interfaces", interfaces_base(ifaces))
+    return root
+
+
+def bulk_delete_interfaces_base(ifaces):
+    root = config()
+    container(root, IF_NS, "interfaces", delete_interfaces(ifaces))
+    return root
+
+
+def bulk_create_interfaces_forwarders_single_tagged(if1, if2, vlanids):
+    vlanids = list(vlanids)
+    root = config()
+    container(root, IF_NS, "interfaces", vlan_subinterfaces_single_tagged(if1, if2, vlanids))
+    forwarding = container(root, L2_FORWARDING_NS, "forwarding")
+    FORWARDING_DATABASES.add(forwarding, database=FORWARDING_DATABASE)
+    container(forwarding, L2_FORWARDING_NS, "forwarders", forwarders(if1, if2, vlanids))
+    return root
+
+
+def bulk_delete_interfaces_forwarders_single_tagged(if1, if2, vlanids):
+    vlanids = list(vlanids)
+    root = config()
+    forwarding = container(root, L2_FORWARDING_NS, "forwarding")
+    container(forwarding, L2_FORWARDING_NS, "forwarders", delete_forwarders(if1, if2, vlanids))
+    container(root, IF_NS, "interfaces", delete_vlan_subinterfaces_single_tagged(if1, if2, vlanids))
+    return root
+
+
+def bulk_create_pairs_forwarders_single_tagged(pairs, vlanids):
+    """
+    bulk_create_interfaces_forwarders_single_tagged() for several (if1, if2)
+    pairs in one payload, for more VLANs than fit on a single interface
+    """
+    vlanids = list(vlanids)
+    root = config()
+    container(root, IF_NS, "interfaces", (
+        entry
+        for if1, if2 in pairs
+        for entry in vlan_subinterfaces_single_tagged(if1, if2, vlanids)
+    ))
+    forwarding = container(root, L2_FORWARDING_NS, "forwarding")
+    FORWARDING_DATABASES.add(forwarding, database=FORWARDING_DATABASE)
+    container(forwarding, L2_FORWARDING_NS, "forwarders", (
+        entry for if1, if2 in pairs for entry in forwarders(if1, if2, vlanids)
+    ))
+    return root
+
+
+def bulk_delete_pairs_forwarders_single_tagged(pairs, vlanids):
+    vlanids = list(vlanids)
+    root = config()
+    forwarding = container(root, L2_FORWARDING_NS, "forwarding")
+    container(forwarding, L2_FORWARDING_NS, "forwarders", (
+        entry for if1, if2 in pairs for entry in delete_forwarders(if1, if2, vlanids)
+    ))
+    container(root, IF_NS, "interfaces", (
+        entry
+        for if1, if2 in pairs
+        for entry in delete_vlan_subinterfaces_single_tagged(if1, if2, vlanids)
+    ))
+    return root
+
+
+def create_interfaces_forwarders_single_tagged(if1, if2, vlanid):
+    return bulk_create_interfaces_forwarders_single_tagged(if1, if2, [vlanid])
+
+
+def delete_interfaces_forwarders_single_tagged(if1, if2, vlanid):
+    return bulk_delete_interfaces_forwarders_single_tagged(if1, if2, [vlanid])
@@ -0,0 +1,70 @@
+"""
+Event driven readiness checks for the Netopeer2 stack
+
+Instead of sleeping for fixed periods these return as soon as a component
+is actually up: the pid file is watched with inotify, TCP ports are probed
+with exponential backoff and the test-service reports readiness itself.
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import socket
+import time
+
+from common import TEST_SERVICE_URL, service_session, wait_for
+
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+
+
+def _inotify_libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    return libc
+
+
+def wait_for_file(path, timeout=100):
+    """Waits until path exists, returns False on timeout"""
+    deadline = time.monotonic() + timeout
+    libc = _inotify_libc()
+    fd = libc.inotify_init1(IN_CLOEXEC) if libc else -1
+    if fd < 0:
+        # no inotify, fall back to polling
+        while not os.path.exists(path):
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    try:
+        directory = os.path.dirname(os.path.abspath(path))
+        if libc.inotify_add_watch(fd, directory.encode(), IN_CREATE | IN_MOVED_TO) < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch " + directory)
+        # checked only after the watch is in place so no creation is missed
+        while not os.path.exists(path):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if readable:
+                os.read(fd, 4096)
+        return True
+    finally:
+        os.close(fd)
+
+
+def wait_for_port(port, host="localhost", timeout=60):
+    """Waits until a TCP connection to host:port is accepted"""
+
+    def connect():
+        socket.create_connection((host, port), timeout=1).close()
+
+    return wait_for(connect, timeout=timeout, period=0.01, backoff=2, max_period=0.5)
+
+
+def test_service_ready():
+    result = service_session().get(TEST_SERVICE_URL + "/ready")
+    assert result.ok
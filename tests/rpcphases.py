@@ -0,0 +1,137 @@
+"""
+Client and server side phases of NETCONF RPCs
+
+A BenchMark around mgr.edit_config() measures everything from serializing
+the request to parsing the reply. RpcPhases hooks into the session of a
+manager to timestamp the steps in between:
+
+    start       the RPC method is called, the payload has been built
+    queued      ncclient has serialized the request and queued it
+    written     the last bytes of the request went to the SSH channel
+    first-byte  the first bytes of the reply arrived on the channel
+    received    the reply has been de-framed and handed to the listeners
+    returned    the reply has been parsed and the RPC method returned
+
+and reports the differences as phases. Only "server" is spent outside of
+the client: netopeer2-server's processing plus the network round trip.
+"queued" to "written" includes the up to 0.1 s ncclient's transport thread
+sleeps before it notices a queued request.
+
+The hooks wrap attributes of the session and its paramiko channel, which
+the transport thread looks up on every use. Messages arriving in between,
+like notifications, are not told apart from the reply, so the session must
+not have subscriptions while it is measured.
+"""
+import collections
+import contextlib
+import time
+
+from ncclient.transport.session import SessionListener
+
+from benchmark import summarize
+
+# phase: (mark it starts at, mark it ends at)
+PHASES = collections.OrderedDict(
+    [
+        ("serialize", ("start", "queued")),
+        ("write", ("queued", "written")),
+        ("server", ("written", "first-byte")),
+        ("receive", ("first-byte", "received")),
+        ("parse", ("received", "returned")),
+    ]
+)
+
+
+class RpcPhases(SessionListener):
+    """Timestamps the RPCs of one session measured with measure()"""
+
+    def __init__(self):
+        # label: phase: [seconds]
+        self.samples = collections.defaultdict(lambda: collections.defaultdict(list))
+        self._marks = None
+        self._session = None
+
+    def attach(self, mgr):
+        session = mgr._session
+        channel = session._channel
+        queue, send, recv = session.send, channel.send, channel.recv
+
+        def queued(message):
+            self._mark(self._marks, "queued")
+            return queue(message)
+
+        # these run on ncclient's transport thread while measure() may
+        # reset self._marks, so they read it only once
+        def written(data):
+            n = send(data)
+            marks = self._marks
+            if marks is not None and "first-byte" not in marks:
+                marks["written"] = time.monotonic()
+            return n
+
+        def received(size):
+            data = recv(size)
+            marks = self._marks
+            if marks is not None and "written" in marks:
+                self._mark(marks, "first-byte")
+            return data
+
+        session.send = queued
+        channel.send = written
+        channel.recv = received
+        session.add_listener(self)
+        self._session = session
+        return self
+
+    def detach(self):
+        session = self._session
+        session.remove_listener(self)
+        del session.send
+        del session._channel.send
+        del session._channel.recv
+        self._session = None
+
+    @staticmethod
+    def _mark(marks, name):
+        if marks is not None and name not in marks:
+            marks[name] = time.monotonic()
+
+    def callback(self, root, raw):
+        marks = self._marks
+        if marks is not None and "first-byte" in marks:
+            self._mark(marks, "received")
+
+    def errback(self, ex):
+        pass
+
+    @contextlib.contextmanager
+    def measure(self, label, bench=None):
+        """
+        Records the phases of the RPC sent in the enclosed block, unless
+        bench is the BenchMark of a warmup iteration
+        """
+        self._marks = {"start": time.monotonic()}
+        try:
+            yield
+        finally:
+            marks, self._marks = self._marks, None
+            marks["returned"] = time.monotonic()
+            if bench is None or not bench.warmup:
+                for phase, (begin, end) in PHASES.items():
+                    if begin in marks and end in marks:
+                        self.samples[label][phase].append(marks[end] - marks[begin])
+
+    def build(self, label, f, *args, **kwds):
+        """Calls f to build a payload and records the time as phase build"""
+        start = time.monotonic()
+        result = f(*args, **kwds)
+        self.samples[label]["build"].append(time.monotonic() - start)
+        return result
+
+    def summary(self, label):
+        """Statistics of every phase recorded for label"""
+        return {
+            phase: summarize(samples)
+            for phase, samples in self.samples[label].items()
+            if samples
+        }
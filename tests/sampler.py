@@ -0,0 +1,184 @@
+"""
+Resource usage of the Netopeer2 stack sampled alongside the tests
+
+A ResourceSampler thread reads /proc/<pid>/stat and /proc/<pid>/fd of
+netopeer2-server and the test-service at a fixed interval, noting CPU
+time, RSS, open file descriptors and threads, and sums up the size of
+sysrepo's SHM files in /dev/shm. BenchMark blocks report their start and
+stop to every running sampler, so the timeseries carries markers of the
+benchmark phases and memory growth can be attributed to them.
+"""
+import glob
+import os
+import threading
+import time
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+_running = []
+_running_lock = threading.Lock()
+
+
+def process_stat(pid):
+    """
+    Returns the fields of /proc/<pid>/stat behind the command name, so
+    field n of proc(5) is at index n - 3, or None if the process does not
+    exist
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            # the command name may contain blanks, skip behind it
+            return f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+
+
+def stat_cpu_time(fields):
+    """User+system CPU time in seconds of the fields from process_stat"""
+    # utime and stime are fields 14 and 15
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def find_pid(name, parent=None):
+    """
+    Returns the pid of a process named name (by /proc/<pid>/comm) or None.
+    With parent only children of the process with that pid are considered.
+    """
+    for comm in glob.glob("/proc/[0-9]*/comm"):
+        pid = int(comm.split("/")[2])
+        try:
+            with open(comm, "r") as f:
+                if f.read().strip() != name:
+                    continue
+        except OSError:
+            continue
+        if parent is not None:
+            # the parent pid is field 4
+            fields = process_stat(pid)
+            if fields is None or int(fields[1]) != parent:
+                continue
+        return pid
+    return None
+
+
+def shm_usage(prefix=None):
+    """
+    Returns the total size in bytes and number of sysrepo's SHM files, those
+    named prefix, an underscore and the file's name
+    """
+    prefix = prefix or os.environ.get("SYSREPO_SHM_PREFIX", "sr")
+    total = files = 0
+    for path in glob.glob("/dev/shm/{}_*".format(prefix)):
+        try:
+            total += os.stat(path).st_size
+            files += 1
+        except OSError:
+            pass
+    return total, files
+
+
+def process_usage(pid):
+    """
+    Returns CPU time (s), RSS (kB), open file descriptors and threads of a
+    process, or None if it does not exist
+    """
+    if pid is None:
+        return None
+    fields = process_stat(pid)
+    if fields is None:
+        return None
+    try:
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return None
+    # threads and rss are fields 20 and 24
+    return {
+        "cpu": stat_cpu_time(fields),
+        "rss": int(fields[21]) * PAGE_SIZE // 1024,
+        "fds": fds,
+        "threads": int(fields[17]),
+    }
+
+
+def mark_phase(phase, event):
+    """Adds a marker to every running sampler"""
+    with _running_lock:
+        samplers = list(_running)
+    for sampler in samplers:
+        sampler.mark(phase, event)
+
+
+class ResourceSampler(threading.Thread):
+    """
+    Samples the processes in pids, a dict of name: pid, and the sysrepo SHM
+    every interval seconds until stop() is called
+    """
+
+    def __init__(self, pids, interval=0.5, shm_prefix=None):
+        super().__init__(name="resource-sampler", daemon=True)
+        self.pids = dict(pids)
+        self.interval = interval
+        self.shm_prefix = shm_prefix
+        self.started = None
+        self.samples = []
+        self.markers = []
+        self._t0 = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        self.started = time.time()
+        self._t0 = time.monotonic()
+        with _running_lock:
+            _running.append(self)
+        super().start()
+        return self
+
+    def run(self):
+        deadline = time.monotonic()
+        while True:
+            self.sample()
+            deadline += self.interval
+            if self._done.wait(max(deadline - time.monotonic(), 0)):
+                break
+        self.sample()
+
+    def sample(self):
+        t = time.monotonic() - self._t0
+        shm, shm_files = shm_usage(self.shm_prefix)
+        sample = {"t": t, "shm": shm, "shm_files": shm_files}
+        for name, pid in self.pids.items():
+            sample[name] = process_usage(pid)
+        with self._lock:
+            self.samples.append(sample)
+
+    def mark(self, phase, event):
+        with self._lock:
+            self.markers.append(
+                {"t": time.monotonic() - self._t0, "phase": phase, "event": event}
+            )
+
+    def stop(self):
+        with _running_lock:
+            _running.remove(self)
+        self._done.set()
+        self.join()
+
+    def timeseries(self):
+        """The samples and markers, times in seconds since the start"""
+        with self._lock:
+            return {
+                "interval": self.interval,
+                "started": self.started,
+                "pids": self.pids,
+                "series": list(self.samples),
+                "markers": list(self.markers),
+            }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exctyp, excval, exctrc):
+        self.stop()
+        return False
@@ -19,8 +19,7 @@ def test_basic_edit(mgr):
     change_contact(mgr, "merge", "TestValue")
     assert get_contact(mgr) == "TestValue"
     assert (
-        event_log.find_change_in_log(
-            event_log.load(),
+        event_log.find_change(
             "SR_EV_CHANGE",
             {
                 "operation": "SR_OP_CREATED",
@@ -36,8 +35,7 @@ def test_basic_edit(mgr):
     change_contact(mgr, "delete", "TestValue")
     assert get_contact(mgr) == "Not Present"
     assert (
-        event_log.find_change_in_log(
-            event_log.load(),
+        event_log.find_change(
             "SR_EV_CHANGE",
             {"operation": "SR_OP_DELETED", "old-path": "/ietf-system:system/contact"},
         )
@@ -1,27 +1,27 @@
 import pytest
-from common import find_single_xpath
+from common import find_single_xpath, read_leaf
 
 
 def test_candidate_config_simple_copy(mgr, cleanup):
     set_simple_both(mgr, "START", "111")
-    response_xml = mgr.get().data_xml
-    assert get_simple_string_from_data_xml(response_xml) == "START"
-    assert get_simple_int_from_data_xml(response_xml) == "111"
+    response = mgr.get().data_ele
+    assert get_simple_string_from_data(response) == "START"
+    assert get_simple_int_from_data(response) == "111"
 
     set_simple_both(mgr, "candidate value", "222", target="candidate")
-    candidate_config = mgr.get_config(source='candidate').data_xml
-    assert get_simple_int_from_data_xml(candidate_config) == '222'
-    assert get_simple_string_from_data_xml(candidate_config) == 'candidate value'
+    candidate_config = mgr.get_config(source='candidate').data_ele
+    assert get_simple_int_from_data(candidate_config) == '222'
+    assert get_simple_string_from_data(candidate_config) == 'candidate value'
 
     # Copy candidate to running
     mgr.copy_config(source="candidate", target="running")
 
-    running_config = mgr.get_config(source='running').data_xml
-    response_xml = mgr.get().data_xml
-    assert get_simple_string_from_data_xml(running_config) == 'candidate value'
-    assert get_simple_string_from_data_xml(response_xml) == 'candidate value'
-    assert get_simple_int_from_data_xml(running_config) == '222'
-    assert get_simple_int_from_data_xml(response_xml) == '222'
+    running_config = mgr.get_config(source='running').data_ele
+    response = mgr.get().data_ele
+    assert get_simple_string_from_data(running_config) == 'candidate value'
+    assert get_simple_string_from_data(response) == 'candidate value'
+    assert get_simple_int_from_data(running_config) == '222'
+    assert get_simple_int_from_data(response) == '222'
 
     clear_data(mgr)
     check_data_cleared(mgr)
@@ -29,24 +29,24 @@ def test_candidate_config_simple_copy(mgr, cleanup):
 
 def test_candidate_config_simple_commit(mgr):
     set_simple_both(mgr, "START", "111")
-    response_xml = mgr.get().data_xml
-    assert get_simple_string_from_data_xml(response_xml) == "START"
-    assert get_simple_int_from_data_xml(response_xml) == "111"
+    response = mgr.get().data_ele
+    assert get_simple_string_from_data(response) == "START"
+    assert get_simple_int_from_data(response) == "111"
 
     set_simple_both(mgr, "candidate value", "222", target="candidate")
-    candidate_config = mgr.get_config(source='candidate').data_xml
-    assert get_simple_int_from_data_xml(candidate_config) == '222'
-    assert get_simple_string_from_data_xml(candidate_config) == 'candidate value'
+    candidate_config = mgr.get_config(source='candidate').data_ele
+    assert get_simple_int_from_data(candidate_config) == '222'
+    assert get_simple_string_from_data(candidate_config) == 'candidate value'
 
     # Send commit message
     mgr.commit()
 
-    running_config = mgr.get_config(source='running').data_xml
-    response_xml = mgr.get().data_xml
-    assert get_simple_string_from_data_xml(running_config) == 'candidate value'
-    assert get_simple_string_from_data_xml(response_xml) == 'candidate value'
-    assert get_simple_int_from_data_xml(running_config) == '222'
-    assert get_simple_int_from_data_xml(response_xml) == '222'
+    running_config = mgr.get_config(source='running').data_ele
+    response = mgr.get().data_ele
+    assert get_simple_string_from_data(running_config) == 'candidate value'
+    assert get_simple_string_from_data(response) == 'candidate value'
+    assert get_simple_int_from_data(running_config) == '222'
+    assert get_simple_int_from_data(response) == '222'
 
     clear_data(mgr)
     check_data_cleared(mgr)
@@ -63,8 +63,8 @@ def test_candidate_config_copy_leaf_edit(mgr):
     mgr.copy_config(source='candidate', target='running')
 
     assert get_config_simple_string(mgr) == 'candidate value'
-    response_xml = mgr.get().data_xml
-    assert get_simple_string_from_data_xml(response_xml) == 'candidate value'
+    response = mgr.get().data_ele
+    assert get_simple_string_from_data(response) == 'candidate value'
 
     clear_simple_string(mgr, 'candidate')
     clear_simple_string(mgr, 'running')
@@ -82,8 +82,8 @@ def test_candidate_config_commit_leaf_edit(mgr):
     mgr.commit()
 
     assert get_config_simple_string(mgr) == 'candidate value'
-    response_xml = mgr.get().data_xml
-    assert get_simple_string_from_data_xml(response_xml) == 'candidate value'
+    response = mgr.get().data_ele
+    assert get_simple_string_from_data(response) == 'candidate value'
 
     clear_simple_string(mgr, 'candidate')
     clear_simple_string(mgr, 'running')
@@ -98,12 +98,12 @@ def clear_data(mgr):
 
 
 def check_data_cleared(mgr):
-    candidate_config = mgr.get_config(source='candidate').data_xml
-    assert get_simple_int_from_data_xml(candidate_config) == 'Not Found'
-    assert get_simple_string_from_data_xml(candidate_config) == 'Not Found'
-    response_xml = mgr.get().data_xml
-    assert get_simple_string_from_data_xml(response_xml) == 'Not Found'
-    assert get_simple_int_from_data_xml(response_xml) == 'Not Found'
+    candidate_config = mgr.get_config(source='candidate').data_ele
+    assert get_simple_int_from_data(candidate_config) == 'Not Found'
+    assert get_simple_string_from_data(candidate_config) == 'Not Found'
+    response = mgr.get().data_ele
+    assert get_simple_string_from_data(response) == 'Not Found'
+    assert get_simple_int_from_data(response) == 'Not Found'
 
 
 def clear_simple_int(mgr, datastore="running"):
@@ -160,26 +160,31 @@ def set_simple_string(mgr, message, target="running"):
     )
 
 
-def get_simple_int_from_data_xml(data_xml):
+def get_simple_int_from_data(data):
     return find_single_xpath(
-        data_xml, "/nc:data/test-cand-cfg:test-candidate-config-container/test-cand-cfg:simple-int"
+        data, "test-cand-cfg:test-candidate-config-container/test-cand-cfg:simple-int"
     )
 
 
-def get_simple_string_from_data_xml(data_xml):
+def get_simple_string_from_data(data):
     return find_single_xpath(
-        data_xml,
-        "/nc:data/test-cand-cfg:test-candidate-config-container/test-cand-cfg:simple-string",
+        data,
+        "test-cand-cfg:test-candidate-config-container/test-cand-cfg:simple-string",
     )
 
 
 def get_simple_string(mgr):
-    return get_simple_string_from_data_xml(mgr.get().data_xml)
+    return read_leaf(
+        mgr, "test-cand-cfg:test-candidate-config-container/test-cand-cfg:simple-string"
+    )
 
 
 def get_config_simple_string(mgr, datastore='running'):
-    return get_simple_string_from_data_xml(
-        mgr.get_config(source=datastore).data_xml)
+    return read_leaf(
+        mgr,
+        "test-cand-cfg:test-candidate-config-container/test-cand-cfg:simple-string",
+        source=datastore,
+    )
 
 
 @pytest.fixture()
@@ -0,0 +1,78 @@
+from lxml import etree
+
+from confdiff import config_diff, stream_diff
+
+SYS = "urn:ietf:params:xml:ns:yang:ietf-system"
+IF = "urn:ietf:params:xml:ns:yang:ietf-interfaces"
+
+
+def data(body):
+    return etree.fromstring(
+        '<data xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">{}</data>'.format(body)
+    )
+
+
+def test_config_diff_merges_split_container():
+    current = data(
+        f'<system xmlns="{SYS}"><contact>admin</contact><location>lab</location></system>'
+    )
+    snippet = data(f'<system xmlns="{SYS}"><location>lab</location></system>')
+    startup = data(f'<system xmlns="{SYS}"><contact>admin</contact></system>')
+
+    assert config_diff(current, [snippet, startup]) == []
+    assert config_diff(current, [snippet]) == ["left  only: /ietf-system:system/contact"]
+
+
+def test_config_diff_joins_list_entries_by_key():
+    left = data(
+        f'<interfaces xmlns="{IF}">'
+        "<interface><name>eth0</name><enabled>true</enabled></interface>"
+        "<interface><name>eth1</name><enabled>false</enabled></interface>"
+        "</interfaces>"
+    )
+    right = data(
+        f'<interfaces xmlns="{IF}">'
+        "<interface><name>eth1</name><enabled>true</enabled></interface>"
+        "<interface><name>eth0</name><enabled>true</enabled></interface>"
+        "</interfaces>"
+    )
+
+    assert config_diff(left, right) == [
+        "element values differ: /ietf-interfaces:interfaces/interface[name='eth1']/enabled",
+        "    left:  false",
+        "    right: true",
+    ]
+
+
+def test_stream_diff_merges_split_container():
+    current = data(
+        f'<system xmlns="{SYS}"><contact>admin</contact><location>lab</location></system>'
+    )
+    snippet = data(f'<system xmlns="{SYS}"><location>lab</location></system>')
+    startup = data(f'<system xmlns="{SYS}"><contact>admin</contact></system>')
+
+    assert list(stream_diff(current, [snippet, startup])) == []
+    assert list(stream_diff(current, [snippet])) == ["left  only: /ietf-system:system/contact"]
+
+
+def test_stream_diff_joins_sorted_runs():
+    names = ["eth{}".format(i) for i in range(20)]
+    left = "".join(
+        "<interface><name>{}</name><enabled>true</enabled></interface>".format(name)
+        for name in names
+    )
+    right = "".join(
+        "<interface><name>{}</name><enabled>{}</enabled></interface>".format(
+            name, "false" if name == "eth7" else "true"
+        )
+        for name in reversed(names[1:])
+    )
+    left = etree.tostring(data(f'<interfaces xmlns="{IF}">{left}</interfaces>'))
+    right = etree.tostring(data(f'<interfaces xmlns="{IF}">{right}</interfaces>'))
+
+    assert list(stream_diff(left, right, run_size=3)) == [
+        "left  only: /ietf-interfaces:interfaces/interface[name='eth0']",
+        "element values differ: /ietf-interfaces:interfaces/interface[name='eth7']/enabled",
+        "    left:  true",
+        "    right: false",
+    ]
@@ -2,10 +2,9 @@
 Tests for leafref data validation
 """
 import pytest
-from lxml import etree
 from ncclient.operations import RPCError
 
-from common import NS_MAP
+from common import read_path
 
 
 def test_create_unresolved_data_is_error(mgr, cleanup):
@@ -97,11 +96,7 @@ def cleanup(mgr):
 
 
 def get_referee_list(mgr):
-    data_xml = mgr.get_config(source="running").data_xml
-    doc = etree.fromstring(data_xml.encode("ascii"))
-    results = doc.xpath(
-        "/nc:data/test-referee:contain-1/test-referee:data", namespaces=NS_MAP
-    )
+    results = read_path(mgr, "test-referee:contain-1/test-referee:data", source="running")
 
     ret = {}
     for entry in results:
@@ -118,11 +113,7 @@ def get_referee_list(mgr):
 
 
 def get_referer_list(mgr):
-    data_xml = mgr.get_config(source="running").data_xml
-    doc = etree.fromstring(data_xml.encode("ascii"))
-    results = doc.xpath(
-        "/nc:data/test-referer:contain-2/test-referer:data-ref", namespaces=NS_MAP
-    )
+    results = read_path(mgr, "test-referer:contain-2/test-referer:data-ref", source="running")
 
     ret = {}
     for entry in results:
@@ -0,0 +1,151 @@
+"""
+Throughput of large NETCONF messages with chunked and end-of-message framing
+
+Both sides of a session announce base:1.1 by default and frame their
+messages in chunks (RFC 6242). A client that leaves base:1.1 out of its
+hello falls back to the base:1.0 end-of-message delimiter, which the
+receiver has to search for in everything it reads. The tests send
+edit-configs of growing size over both kinds of session and read the
+configuration back with get-config, recording the MB/s seen by the client
+and the CPU time netopeer2-server spends on them.
+
+The payloads are built with the bulk builders of the scale tests. A VLAN id
+is at most 4094, so the larger payloads spread their VLANs over several
+pairs of parent interfaces.
+"""
+import math
+import statistics
+
+import pytest
+from ncclient.devices.default import DefaultDeviceHandler
+from ncclient.operations.errors import TimeoutExpiredError
+from ncclient.transport.session import NetconfBase
+
+from common import connect_mgr
+from payloads import (
+    bulk_create_interfaces_base,
+    bulk_create_pairs_forwarders_single_tagged,
+    bulk_delete_interfaces_base,
+    bulk_delete_pairs_forwarders_single_tagged,
+    payload_size,
+)
+from rpcphases import RpcPhases
+
+BASE_11 = "urn:ietf:params:netconf:base:1.1"
+MAX_VLAN_ID = 4094
+
+# the RPC timeout of the sessions, a 100 MB edit takes minutes
+FRAMING_TIMEOUT = 3600
+
+# payload sizes in bytes
+PAYLOAD_SIZES = [10**3, 10**4, 10**5, 10**6, 10**7, 10**8]
+
+GET_FILTER = """
+    <filter xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+      <interfaces xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces"/>
+      <forwarding xmlns="urn:bbf:yang:bbf-l2-forwarding"/>
+    </filter>
+"""
+
+
+class Base10DeviceHandler(DefaultDeviceHandler):
+    """Leaves base:1.1 out of the hello, the session uses base:1.0 framing"""
+
+    def get_capabilities(self):
+        return [c for c in super().get_capabilities() if c != BASE_11]
+
+
+FRAMINGS = {
+    "1.1": ({}, NetconfBase.BASE_11),
+    "1.0": ({"device_params": {"handler": Base10DeviceHandler}}, NetconfBase.BASE_10),
+}
+
+
+def vlan_layout(size):
+    """
+    The (pairs, vlanids) whose create payload is about size bytes, estimated
+    from the size of a single pair with 100 VLANs
+    """
+    sample = payload_size(
+        bulk_create_pairs_forwarders_single_tagged([interface_pair(0)], range(1, 101))
+    )
+    vlans = max(1, round(size / (sample / 100)))
+    pair_count = math.ceil(vlans / MAX_VLAN_ID)
+    pairs = [interface_pair(i) for i in range(pair_count)]
+    return pairs, range(1, math.ceil(vlans / pair_count) + 1)
+
+
+def interface_pair(i):
+    return ("ethernet 0/{}:1".format(2 * i + 1), "ethernet 0/{}:1".format(2 * i + 2))
+
+
+@pytest.fixture()
+def framing_mgr(request, framing, size):
+    """A session of its own using the framing under test"""
+    max_size = request.config.getoption('--bench-framing-max-size')
+    if size > max_size:
+        pytest.skip('payload larger than --bench-framing-max-size={}'.format(max_size))
+    params, base = FRAMINGS[framing]
+    mgr = connect_mgr(timeout=FRAMING_TIMEOUT, **params)
+    assert mgr._session._base == base
+    yield mgr
+    mgr.close_session()
+
+
+@pytest.mark.long_runner()
+@pytest.mark.parametrize('size', PAYLOAD_SIZES)
+@pytest.mark.parametrize('framing', sorted(FRAMINGS))
+def test_framing_throughput(bench_recorder, bench_trials, framing_mgr, request, framing, size):
+    pairs, vlanids = vlan_layout(size)
+    ifaces = [iface for pair in pairs for iface in pair]
+    phases = RpcPhases().attach(framing_mgr)
+    create_config = phases.build('create', bulk_create_pairs_forwarders_single_tagged, pairs, vlanids)
+    delete_config = phases.build('delete', bulk_delete_pairs_forwarders_single_tagged, pairs, vlanids)
+    create_bytes = payload_size(create_config)
+    delete_bytes = payload_size(delete_config)
+    reply_bytes = []
+
+    def edit(b, config, label):
+        try:
+            with phases.measure(label, b):
+                framing_mgr.edit_config(target='running', config=config)
+        except TimeoutExpiredError as e:
+            b.error = str(e)
+
+    def create(b):
+        edit(b, create_config, 'create')
+
+    def get(b):
+        try:
+            with phases.measure('get', b):
+                reply = framing_mgr.get_config(source='running', filter=GET_FILTER)
+            reply_bytes.append(len(reply.xml.encode('utf-8')))
+        except TimeoutExpiredError as e:
+            b.error = str(e)
+
+    def delete(b):
+        edit(b, delete_config, 'delete')
+
+    framing_mgr.edit_config(target='running', config=bulk_create_interfaces_base(ifaces))
+    try:
+        creates, gets, deletes = bench_trials.run(create, get, delete)
+    finally:
+        framing_mgr.edit_config(target='running', config=bulk_delete_interfaces_base(ifaces))
+        phases.detach()
+
+    entries = []
+    for phase, benches, nbytes in (
+        ('create', creates, create_bytes),
+        ('get', gets, max(reply_bytes, default=0)),
+        ('delete', deletes, delete_bytes),
+    ):
+        wall = statistics.median(b.elapsed for b in benches)
+        entries.append(bench_recorder.record(
+            request, phase, benches,
+            vlan_count=len(pairs) * len(vlanids),
+            framing=framing,
+            bytes=nbytes,
+            mb_per_s=nbytes / wall / 1e6 if wall else 0.0,
+            phases=phases.summary(phase),
+        ))
+    assert not [e['error'] for e in entries if e['error']]
@@ -19,7 +19,18 @@ import pytest
 from lxml import etree
 from ncclient.xml_ import to_ele
 
-from common import send_notification, NS_MAP
+from common import (
+    find_xpath,
+    send_notification,
+    send_notifications,
+    enable_replay,
+    disable_replay,
+    NS_MAP,
+)
+from notifbench import subscribe, subtree_filter
+
+# subscriptions cannot be cancelled, so the sessions are not reusable
+pytestmark = pytest.mark.exclusive_session
 
 
 @pytest.fixture()
@@ -150,12 +161,40 @@ def test_basic_notification(mgr, request):
     )
 
 
+def test_batch_notifications(mgr):
+    mgr.dispatch(
+        to_ele(
+            """
+            <create-subscription xmlns="urn:ietf:params:xml:ns:netconf:notification:1.0">
+              <filter>
+                <hardware-state-change xmlns="urn:ietf:params:xml:ns:yang:ietf-hardware" />
+              </filter>
+            </create-subscription>
+            """
+        )
+    )
+    count = 20
+    result = send_notifications(
+        ({"xpath": "/ietf-hardware:hardware-state-change", "values": []}
+         for _ in range(count)),
+        interval_us=1000,
+        batch_size=8,
+    )
+    assert result["sent"] == count and result["failed"] == 0
+    for _ in range(count):
+        n = mgr.take_notification(timeout=10)
+        assert n is not None
+        assert n.notification_ele.xpath(
+            "//ietf-hw:hardware-state-change", namespaces=NS_MAP
+        )
+
+
 def find_notifications_matching(mgr, xpath):
     while True:
         notification = mgr.take_notification(timeout=10)
         assert notification is not None
 
-        results = notification.notification_ele.xpath(xpath, namespaces=NS_MAP)
+        results = find_xpath(notification.notification_ele, xpath)
         if len(results) > 0:
             return results
 
@@ -507,3 +546,43 @@ def test_embedded_notification_list_in_list(mgr, notification_cleanup):
 
     clear_notification_list_item(mgr, "NotificationOuter")
     assert get_embedded_list(mgr) == {}
+
+
+@pytest.fixture()
+def replay_enabled():
+    enable_replay("test-notifications")
+    yield
+    disable_replay("test-notifications")
+
+
+def test_replay_notifications(mgr, replay_enabled):
+    """
+    Replays the notifications sent between startTime and stopTime, followed
+    by replayComplete and notificationComplete
+    """
+    start = time.time()
+    for value in ["Replay1", "Replay2", "Replay3"]:
+        generate_test_notification_simple_string_notif(value)
+    stop = time.time()
+    generate_test_notification_simple_string_notif("After stopTime")
+
+    subscribe(mgr, subtree_filter("simple"), start_time=start, stop_time=stop)
+    replayed = [
+        find_notifications_matching(
+            mgr,
+            (
+                "/notif:notification"
+                "/test-notification:string-container-simple-string-changed"
+                "/test-notification:new-value"
+            ),
+        )[0].text
+        for _ in range(3)
+    ]
+    assert replayed == ["Replay1", "Replay2", "Replay3"]
+
+    n = mgr.take_notification(timeout=10)
+    assert n is not None
+    assert find_xpath(n.notification_ele, "nm-notif:replayComplete")
+    n = mgr.take_notification(timeout=10)
+    assert n is not None
+    assert find_xpath(n.notification_ele, "nm-notif:notificationComplete")
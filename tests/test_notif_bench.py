@@ -0,0 +1,251 @@
+"""
+Throughput and latency of notifications delivered to NETCONF subscribers
+"""
+import statistics
+import time
+
+import pytest
+
+from benchmark import BenchMark, summarize
+from common import (
+    disable_replay,
+    enable_replay,
+    set_notification_list_item,
+    set_test_notification_container_notification_string,
+)
+from notifbench import (
+    FANOUT_SUBSCRIPTIONS,
+    LIST_KEYS,
+    NotificationCollector,
+    delivery_stats,
+    inject,
+    inject_schedule,
+    mixed_schedule,
+    open_sessions,
+    subscribe,
+    subtree_filter,
+)
+
+# subscriptions cannot be cancelled, so the sessions are not reusable
+pytestmark = pytest.mark.exclusive_session
+
+# the fan-out test sends 1000 notifications per second and counts those
+# arriving more than LATE_AFTER seconds after being sent as late
+FANOUT_INTERVAL_US = 1000
+LATE_AFTER = 1.0
+
+# rate at which the replay store is filled, 10000 notifications per second
+REPLAY_INTERVAL_US = 100
+
+
+@pytest.fixture()
+def notification_parents(mgr):
+    """The container and list entry the embedded notifications are sent for"""
+    set_test_notification_container_notification_string(mgr, "bench")
+    for key in LIST_KEYS:
+        set_notification_list_item(mgr, key, "bench")
+    yield
+    mgr.edit_config(
+        target="running",
+        config="""
+      <nc:config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">
+        <notification-from-container
+            nc:operation="remove" xmlns="http://www.example.com/ns/yang/test-notifications"
+        />
+        <notification-from-list
+            nc:operation="remove" xmlns="http://www.example.com/ns/yang/test-notifications"
+        />
+      </nc:config>
+    """,
+    )
+
+
+def measure_delivery(sessions, kind, count, filter_xml):
+    """
+    Subscribes all sessions, sends count notifications of kind and waits
+    until every subscriber has received them. Returns the injection result,
+    the wall time and the statistics of each subscriber.
+    """
+    collectors = [NotificationCollector().attach(s) for s in sessions]
+    for session in sessions:
+        subscribe(session, filter_xml)
+
+    start = time.monotonic()
+    sent = inject(kind, count)
+    deadline = start + max(30, count / 100)
+    for collector in collectors:
+        collector.wait(count, max(deadline - time.monotonic(), 0))
+    wall = time.monotonic() - start
+
+    deliveries = [c.deliveries() for c in collectors]
+    stats = [delivery_stats(d, range(count)) for d in deliveries]
+    latencies = [d.latency for subscriber in deliveries for d in subscriber]
+    return sent, wall, stats, latencies
+
+
+def record_delivery(bench_recorder, request, sent, wall, stats, latencies, **params):
+    received = sum(s["received"] for s in stats)
+    return bench_recorder.record_entry(
+        request,
+        "deliver",
+        wall=wall,
+        sessions=len(stats),
+        operations=received,
+        throughput=received / wall if wall else 0.0,
+        latency=summarize(latencies) if latencies else None,
+        subscribers=stats,
+        sent=sent["sent"],
+        send_wall=sent["elapsed-us"] / 1e6,
+        dropped=sum(s["dropped"] for s in stats),
+        repeat=1,
+        **params
+    )
+
+
+@pytest.mark.long_runner()
+@pytest.mark.parametrize("filtered", [False, True], ids=["unfiltered", "filtered"])
+@pytest.mark.parametrize("kind", ["simple", "container", "list"])
+def test_notification_delivery(
+    bench_recorder, bench_notifications, mgr, request, notification_parents, kind, filtered
+):
+    """
+    Sends notifications to a single subscriber, with and without a subtree
+    filter, for top level and container or list embedded notifications
+    """
+    sent, wall, stats, latencies = measure_delivery(
+        [mgr], kind, bench_notifications, subtree_filter(kind) if filtered else None
+    )
+    record_delivery(
+        bench_recorder, request, sent, wall, stats, latencies, kind=kind, filtered=filtered
+    )
+    assert sent["failed"] == 0
+    assert stats[0]["dropped"] == 0
+
+
+@pytest.mark.long_runner()
+@pytest.mark.parametrize("subscribers", [1, 2, 4, 8, 16])
+def test_notification_subscribers(
+    bench_recorder, bench_notifications, mgr, request, notification_parents, subscribers
+):
+    """Sends the same notifications to several concurrent subscribers"""
+    with open_sessions(subscribers) as sessions:
+        sent, wall, stats, latencies = measure_delivery(
+            sessions, "list", bench_notifications, subtree_filter("list")
+        )
+    record_delivery(
+        bench_recorder, request, sent, wall, stats, latencies, kind="list", filtered=True
+    )
+    assert sent["failed"] == 0
+    assert [s["dropped"] for s in stats] == [0] * subscribers
+
+
+@pytest.mark.long_runner()
+@pytest.mark.parametrize("subscribers", [10, 50, 100, 200])
+def test_notification_fanout(
+    bench_recorder, bench_notifications, mgr, request, notification_parents, stack_pids,
+    subscribers
+):
+    """
+    Opens many subscribers with a mix of subtree filters while the
+    test-service emits a mixed stream of notifications at a fixed rate, and
+    records each subscriber's latency, dropped and late notifications along
+    with the CPU time and RSS of netopeer2-server
+    """
+    schedule = mixed_schedule(bench_notifications)
+    subscriptions = [
+        FANOUT_SUBSCRIPTIONS[i % len(FANOUT_SUBSCRIPTIONS)] for i in range(subscribers)
+    ]
+    expected = [
+        [seq for seq, kind, key in schedule if selects(kind, key)]
+        for _, _, selects in subscriptions
+    ]
+
+    with open_sessions(subscribers) as sessions:
+        collectors = [NotificationCollector().attach(s) for s in sessions]
+        for session, (_, kind, _) in zip(sessions, subscriptions):
+            subscribe(session, subtree_filter(kind) if kind else None)
+
+        with BenchMark(pid=stack_pids["netopeer2-server"]) as bench:
+            sent = inject_schedule(schedule, interval_us=FANOUT_INTERVAL_US)
+            deadline = time.monotonic() + 30
+            for collector, seqs in zip(collectors, expected):
+                collector.wait(len(seqs), max(deadline - time.monotonic(), 0))
+
+    deliveries = [c.deliveries() for c in collectors]
+    stats = []
+    for (name, _, _), received, seqs in zip(subscriptions, deliveries, expected):
+        subscriber = delivery_stats(received, seqs, late_after=LATE_AFTER)
+        subscriber["filter"] = name
+        stats.append(subscriber)
+    latencies = [d.latency for received in deliveries for d in received]
+
+    bench_recorder.record(
+        request,
+        "fanout",
+        bench,
+        sessions=subscribers,
+        operations=sum(s["received"] for s in stats),
+        latency=summarize(latencies) if latencies else None,
+        subscribers=stats,
+        sent=sent["sent"],
+        dropped=sum(s["dropped"] for s in stats),
+        late=sum(s["late"] for s in stats),
+    )
+    assert sent["failed"] == 0
+    assert [s["dropped"] for s in stats] == [0] * subscribers
+
+
+@pytest.fixture(scope="module")
+def replay_store(request, services):
+    """
+    Fills the replay store with --bench-replay-volume notifications sent at
+    a fixed rate and returns the time span they were sent in and their count
+    """
+    volume = request.config.getoption("--bench-replay-volume")
+    enable_replay("test-notifications")
+    start = time.time()
+    sent = inject("simple", volume, interval_us=REPLAY_INTERVAL_US)
+    stop = time.time()
+    assert sent["failed"] == 0
+    yield start, stop, volume
+    disable_replay("test-notifications")
+
+
+@pytest.mark.long_runner()
+@pytest.mark.parametrize("window", [0.01, 0.1, 0.5, 1.0])
+def test_notification_replay(bench_recorder, bench_trials, request, replay_store, window):
+    """
+    Replays the given fraction of the stored notifications with startTime and
+    stopTime and measures the time from create-subscription to replayComplete
+    """
+    start, stop, volume = replay_store
+    stop_time = start + window * (stop - start)
+    replayed = []
+
+    with open_sessions(bench_trials.warmup + bench_trials.repeat) as sessions:
+        unused = iter(sessions)
+
+        def replay(b):
+            session = next(unused)
+            collector = NotificationCollector().attach(session)
+            subscribe(session, subtree_filter("simple"), start, stop_time)
+            if not collector.wait_replay_complete(max(30, volume / 1000)):
+                b.error = "replayComplete not received"
+            replayed.append(len(collector.arrivals))
+
+        replays, = bench_trials.run(replay)
+
+    counts = replayed[bench_trials.warmup:]
+    wall = statistics.median(b.elapsed for b in replays)
+    bench_recorder.record(
+        request,
+        "replay",
+        replays,
+        window=window,
+        stored=volume,
+        operations=statistics.median(counts),
+        throughput=statistics.median(counts) / wall if wall else 0.0,
+        replayed=counts,
+    )
+    assert all(b.error is None for b in replays)
+    assert min(counts) > 0
@@ -1,283 +1,35 @@
-import pytest
 import time
-import os
-from lxml import etree
-from ncclient.operations.errors import TimeoutExpiredError
-
-
-def pretty_xml(xml):
-    """ Returns a beautified XML string """
-    try:
-        #parser = etree.XMLParser(remove_blank_text=True)
-        tree = etree.fromstring(xml.encode('utf-8'))
-        return etree.tostring(tree, pretty_print=True).decode()
-    except:
-        print(f"ERROR pretty_xml() xml:{xml}")
-        raise
-
-
-def prepend_config(xml):
-    return pretty_xml(
-        f'''<nc:config xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0">{xml}</nc:config>'''
-    )
-
-
-###############################################################################
-# ietf-interfaces
-###############################################################################
-
-
-def prepend_interfaces(xml):
-    return f"""<interfaces xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">{xml}</interfaces>"""
 
+import pytest
+from ncclient.operations.errors import TimeoutExpiredError
 
-def create_vlan_subinterface_single_tagged(interface, vlanid):
-    return f"""
-        <interface nc:operation="create">
-          <name>{interface}.{vlanid}</name>
-          <type xmlns:ift="urn:bbf:yang:bbf-if-type">ift:vlan-sub-interface</type>
-          <enabled>true</enabled>
-          <subif-lower-layer xmlns="urn:bbf:yang:bbf-sub-interfaces">
-              <interface>{interface}</interface>
-          </subif-lower-layer>
-          <inline-frame-processing xmlns="urn:bbf:yang:bbf-sub-interfaces">
-            <ingress-rule>
-              <rule>
-                <name>1</name>
-                <priority>1</priority>
-                <flexible-match>
-                  <match-criteria xmlns="urn:bbf:yang:bbf-sub-interface-tagging">
-                    <tag>
-                      <index>0</index>
-                      <dot1q-tag>
-                        <tag-type xmlns:q="urn:bbf:yang:bbf-dot1q-types">q:s-vlan</tag-type>
-                        <vlan-id>{vlanid}</vlan-id>
-                      </dot1q-tag>
-                    </tag>
-                  </match-criteria>
-                </flexible-match>
-              </rule>
-            </ingress-rule>
-          </inline-frame-processing>
-        </interface>"""
-
-
-def create_interface_base(iface):
-    return f"""
+from benchmark import BenchMark, process_rss, trend
+from common import connect_mgr
+from event_log import EventLog
+from loadgen import run_sessions
+from payloads import (
+    bulk_create_interfaces_base,
+    bulk_create_interfaces_forwarders_single_tagged,
+    bulk_delete_interfaces_base,
+    bulk_delete_interfaces_forwarders_single_tagged,
+    create_interfaces_forwarders_single_tagged,
+    delete_interfaces_forwarders_single_tagged,
+)
+from sampler import shm_usage
+
+
+def get_config_vlan_subinterface(mgr, interface, vlanid):
+    return mgr.get_config(
+        source='running',
+        filter=f"""
+    <filter xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+      <interfaces xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">
         <interface>
-          <name>{iface}</name>
-          <enabled>true</enabled>
-          <type xmlns:ianaift="urn:ietf:params:xml:ns:yang:iana-if-type">ianaift:ethernetCsmacd</type>
+          <name>{interface}.{vlanid}</name>
         </interface>
-    """
-
-
-def delete_interface(interface):
-    return f"""<interface nc:operation='remove'>
-                 <name>{interface}</name>
-               </interface>"""
-
-
-def delete_vlan_subinterface_single_tagged(interface, vlanid):
-    return delete_interface(f"{interface}.{vlanid}")
-
-
-###############################################################################
-# bbf-forwarder
-###############################################################################
-
-
-def prepend_forwarding(xml):
-    return f"""<forwarding xmlns="urn:bbf:yang:bbf-l2-forwarding">{xml}</forwarding>"""
-
-def prepend_forwarding_databases(xml):
-    return f"""<forwarding-databases>{xml}</forwarding-databases>"""
-
-def create_forwarding_databases_database(name):
-    return f"""
-        <forwarding-database nc:operation="merge">
-            <name>{name}</name>
-        </forwarding-database>"""
-
-def prepend_forwarding_forwarders(xml):
-    return f"""<forwarders>{xml}</forwarders>"""
-
-def remove_forwarders():
-    return f"""<forwarders nc:operation='remove'></forwarders>"""
-
-def xml_forwarder(fwdr_name: str, subifs: list, db=None) -> str:
-    """This function does not create a forwarder. It *constructs* the raw xml for:
-        A single forwarder with any number of ports, and optional mac-learning database.
-    """
-    mac_learning = "" if db is None else f"""
-        <mac-learning>
-            <forwarding-database>{db}</forwarding-database>
-        </mac-learning>"""
-    ports = "".join([f"""
-        <port>
-            <name>{subif}</name>
-            <sub-interface>{subif}</sub-interface>
-        </port>"""
-    for subif in subifs])
-
-    return f"""
-        <forwarder nc:operation="create">
-            <name>{fwdr_name}</name>
-                <ports>
-                    {ports}
-                </ports>
-                {mac_learning}
-        </forwarder>"""
-
-
-def create_forwarding_forwarders_forwarder(database, subif1, subif2):
-    return f"""
-       <forwarder nc:operation="create">
-          <name>fwd-{subif1}-{subif2}</name>
-		  <ports>
-			<port>
-              <name>{subif1}</name>
-              <sub-interface>{subif1}</sub-interface>
-            </port>
-			<port>
-              <name>{subif2}</name>
-              <sub-interface>{subif2}</sub-interface>
-            </port>
-          </ports>
-          <mac-learning>
-            <forwarding-database>{database}</forwarding-database>
-          </mac-learning>
-       </forwarder>"""
-
-
-def delete_forwarding_forwarders_forwarder(database, subif1, subif2):
-    return f"""
-       <forwarder nc:operation="remove">
-          <name>fwd-{subif1}-{subif2}</name>
-       </forwarder>"""
-
-
-def create_subifs_forwarding_forwarders_forwarder(database, vlanid, interfaces):
-    port_str = ""
-
-    for interface in interfaces:
-        port_str += f"""
-			<port>
-              <name>{interface}.{vlanid}</name>
-              <sub-interface>{interface}.{vlanid}</sub-interface>
-            </port>"""
-
-    return f"""
-       <forwarder nc:operation="create">
-          <name>{vlanid}</name>
-		  <ports>{port_str}
-          </ports>
-          <mac-learning>
-            <forwarding-database>{database}</forwarding-database>
-          </mac-learning>
-       </forwarder>"""
-
-
-def delete_subifs_forwarding_forwarders_forwarder(database, vlanid):
-    return f"""
-       <forwarder nc:operation="remove">
-          <name>{vlanid}</name>
-       </forwarder>"""
-
-
-###############################################################################
-# single operations
-###############################################################################
-
-
-def create_interfaces_forwarders_single_tagged(if1, if2, vlanid):
-    return prepend_config(
-        prepend_interfaces(
-            create_vlan_subinterface_single_tagged(if1, vlanid) +
-            create_vlan_subinterface_single_tagged(if2, vlanid)
-        ) +
-        prepend_forwarding(
-            prepend_forwarding_databases(
-                create_forwarding_databases_database("FDB1")
-            ) +
-            prepend_forwarding_forwarders(
-                create_forwarding_forwarders_forwarder("FDB1", f"{if1}.{vlanid}", f"{if2}.{vlanid}")
-            )
-        )
-    )
-
-
-def delete_interfaces_forwarders_single_tagged(if1, if2, vlanid):
-    return prepend_config(
-        prepend_forwarding(
-            prepend_forwarding_forwarders(
-                delete_forwarding_forwarders_forwarder("FDB1", f"{if1}.{vlanid}", f"{if2}.{vlanid}")
-            )
-        ) +
-        prepend_interfaces(
-            delete_vlan_subinterface_single_tagged(if1, vlanid) +
-            delete_vlan_subinterface_single_tagged(if2, vlanid)
-        )
-    )
-
-
-###############################################################################
-# bulk operations
-###############################################################################
-
-
-def bulk_create_interfaces_base(ifaces):
-    return prepend_config(
-        prepend_interfaces(
-            "".join([create_interface_base(iface)
-                     for iface in ifaces])
-        )
-    )
-
-
-def bulk_delete_interfaces_base(ifaces):
-    return prepend_config(
-        prepend_interfaces(
-            "".join([delete_interface(iface)
-                     for iface in ifaces])
-        )
-    )
-
-
-def bulk_create_interfaces_forwarders_single_tagged(if1, if2, vlanids):
-    return prepend_config(
-        prepend_interfaces(
-            "".join([create_vlan_subinterface_single_tagged(if1, vlanid)
-                     for vlanid in vlanids]) +
-            "".join([create_vlan_subinterface_single_tagged(if2, vlanid)
-                     for vlanid in vlanids])
-        ) +
-        prepend_forwarding(
-            prepend_forwarding_databases(
-                create_forwarding_databases_database("FDB1")
-            ) +
-            prepend_forwarding_forwarders(
-                "".join([create_forwarding_forwarders_forwarder("FDB1", f"{if1}.{vlanid}", f"{if2}.{vlanid}")
-                         for vlanid in vlanids])
-            )
-        )
-    )
-
-
-def bulk_delete_interfaces_forwarders_single_tagged(if1, if2, vlanids):
-    return prepend_config(
-        prepend_forwarding(
-            prepend_forwarding_forwarders(
-                "".join([delete_forwarding_forwarders_forwarder("FDB1", f"{if1}.{vlanid}", f"{if2}.{vlanid}")
-                         for vlanid in vlanids])
-            )
-        ) +
-        prepend_interfaces(
-            "".join([delete_vlan_subinterface_single_tagged(if1, vlanid)
-                        for vlanid in vlanids]) +
-            "".join([delete_vlan_subinterface_single_tagged(if2, vlanid)
-                        for vlanid in vlanids])
-        )
+      </interfaces>
+    </filter>
+    """,
     )
 
 
@@ -290,28 +42,7 @@ SkipScaleTests = True
 
 
 BaseInterfaces = ['ethernet 0/1:1', 'ethernet 0/2:1']
-BenchMarkFile = '/var/log/benchmark.log'
-
-
-class BenchMark:
-    def __init__(self):
-        self.start = 0.0
-        self.stop = 0.0
-        self.elapsed = 0.0
-
-    def __enter__(self):
-        self.start = time.time()
-        return self
-
-    def __exit__(self, exctyp, excval, exctrc):
-        self.stop = time.time()
-        self.elapsed = self.stop-self.start
-        return False
-
-@pytest.fixture(scope='session')
-def setup_log():
-    if os.path.exists(BenchMarkFile):
-        os.remove(BenchMarkFile)
+VlansPerSession = 50
 
 
 @pytest.fixture()
@@ -331,97 +62,230 @@ def cleanup(mgr):
     )
 
 
+def edit_configs(mgr, bench, configs, phases=None, label=None):
+    """
+    Sends the edits one after another, remembering a timeout in bench. The
+    phases of each edit are recorded under label if phases is given and
+    bench is not a warmup iteration.
+    """
+    for config in configs:
+        try:
+            if phases is None:
+                mgr.edit_config(target='running', config=config)
+            else:
+                with phases.measure(label, bench):
+                    mgr.edit_config(target='running', config=config)
+        except TimeoutExpiredError as e:
+            bench.error = str(e)
+
+
+def run_create_delete(request, mgr, rpc_phases, bench_trials, bench_recorder, bench_gate,
+                      create_configs, delete_configs, vlan_count):
+    """
+    Benchmarks sending create_configs and then delete_configs, and records
+    and gates both phases
+    """
+    def create(b):
+        edit_configs(mgr, b, create_configs, rpc_phases, 'create')
+
+    def delete(b):
+        edit_configs(mgr, b, delete_configs, rpc_phases, 'delete')
+
+    creates, deletes = bench_trials.run(create, delete)
+    bench_gate(
+        bench_recorder.record(request, 'create', creates, vlan_count=vlan_count,
+                              phases=rpc_phases.summary('create')),
+        bench_recorder.record(request, 'delete', deletes, vlan_count=vlan_count,
+                              phases=rpc_phases.summary('delete')),
+    )
+
+
 @pytest.mark.long_runner()
 @pytest.mark.parametrize('vlan_count', [10, 20, 50, 100, ])
-def test_scale_single(setup_log, mgr, request, setup, cleanup, vlan_count):
-    with open(BenchMarkFile, 'a') as f:
-
-        f.write('%s create:' % request.node.name)
-        with BenchMark() as b:
-            for vlan in range(0, vlan_count):
-                try:
-                    mgr.edit_config(
-                        target='running',
-                        config=create_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], vlan+1),
-                    )
-                except TimeoutExpiredError as e:
-                    f.write(' (%s)' % str(e))
-        f.write(' %.1f sec\n' % b.elapsed)
-
-        f.write('%s delete:' % request.node.name)
-        with BenchMark() as b:
-            for vlan in range(0, vlan_count):
-                try:
-                    mgr.edit_config(
-                        target='running',
-                        config=delete_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], vlan+1),
-                    )
-                except TimeoutExpiredError as e:
-                    f.write(' (%s)' % str(e))
-        f.write(' %.1f sec\n' % b.elapsed)
+def test_scale_single(bench_recorder, bench_trials, bench_gate, mgr, rpc_phases, request, setup, cleanup, vlan_count):
+    # the payloads are built before the measurement
+    create_configs = [
+        rpc_phases.build('create', create_interfaces_forwarders_single_tagged, BaseInterfaces[0], BaseInterfaces[1], vlan+1)
+        for vlan in range(0, vlan_count)
+    ]
+    delete_configs = [
+        rpc_phases.build('delete', delete_interfaces_forwarders_single_tagged, BaseInterfaces[0], BaseInterfaces[1], vlan+1)
+        for vlan in range(0, vlan_count)
+    ]
+    run_create_delete(request, mgr, rpc_phases, bench_trials, bench_recorder, bench_gate,
+                      create_configs, delete_configs, vlan_count)
 
 
 @pytest.mark.long_runner()
 @pytest.mark.parametrize('vlan_count', [10, 20, 50, 100, 200, 500, 1000, ])
-def test_scale_bulk(setup_log, mgr, request, setup, cleanup, vlan_count):
-    with open(BenchMarkFile, 'a') as f:
-
-        f.write('%s create:' % request.node.name)
-        with BenchMark() as b:
-            try:
-                mgr.edit_config(
-                    target='running',
-                    config=bulk_create_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
-                )
-            except TimeoutExpiredError as e:
-                f.write(' (%s)' % str(e))
-        f.write(' %.1f sec\n' % b.elapsed)
-
-        f.write('%s delete:' % request.node.name)
-        with BenchMark() as b:
-            try:
-                mgr.edit_config(
-                    target='running',
-                    config=bulk_delete_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
-                )
-            except TimeoutExpiredError as e:
-                f.write(' (%s)' % str(e))
-        f.write(' %.1f sec\n' % b.elapsed)
+def test_scale_bulk(bench_recorder, bench_trials, bench_gate, mgr, rpc_phases, request, setup, cleanup, vlan_count):
+    create_configs = [
+        rpc_phases.build('create', bulk_create_interfaces_forwarders_single_tagged, BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
+    ]
+    delete_configs = [
+        rpc_phases.build('delete', bulk_delete_interfaces_forwarders_single_tagged, BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
+    ]
+    run_create_delete(request, mgr, rpc_phases, bench_trials, bench_recorder, bench_gate,
+                      create_configs, delete_configs, vlan_count)
 
 
 @pytest.mark.long_runner()
 @pytest.mark.parametrize('vlan_count', [10, 20, 50, 100, 200, 500, 1000, ])
-def test_scale_bulk_plus_one(setup_log, mgr, request, setup, cleanup, vlan_count):
-    with open(BenchMarkFile, 'a') as f:
-
-        f.write('%s create:' % request.node.name)
-        with BenchMark() as b:
-            try:
-                mgr.edit_config(
-                    target='running',
-                    config=bulk_create_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
-                )
-                mgr.edit_config(
-                    target='running',
-                    config=create_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], vlan_count+1),
-                )
-            except TimeoutExpiredError as e:
-                f.write(' (%s)' % str(e))
-        f.write(' %.1f sec\n' % b.elapsed)
-
-        f.write('%s delete:' % request.node.name)
-        with BenchMark() as b:
-            try:
-                mgr.edit_config(
-                    target='running',
-                    config=delete_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], vlan_count+1),
-                )
-                mgr.edit_config(
-                    target='running',
-                    config=bulk_delete_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
-                )
-            except TimeoutExpiredError as e:
-                f.write(' (%s)' % str(e))
-        f.write(' %.1f sec\n' % b.elapsed)
+def test_scale_bulk_plus_one(bench_recorder, bench_trials, bench_gate, mgr, rpc_phases, request, setup, cleanup, vlan_count):
+    create_configs = [
+        rpc_phases.build('create', bulk_create_interfaces_forwarders_single_tagged, BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
+        rpc_phases.build('create', create_interfaces_forwarders_single_tagged, BaseInterfaces[0], BaseInterfaces[1], vlan_count+1),
+    ]
+    delete_configs = [
+        rpc_phases.build('delete', delete_interfaces_forwarders_single_tagged, BaseInterfaces[0], BaseInterfaces[1], vlan_count+1),
+        rpc_phases.build('delete', bulk_delete_interfaces_forwarders_single_tagged, BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
+    ]
+    run_create_delete(request, mgr, rpc_phases, bench_trials, bench_recorder, bench_gate,
+                      create_configs, delete_configs, vlan_count)
+
+
+def soak_limits(config):
+    return {
+        'rss': config.getoption('--soak-max-rss-slope'),
+        'shm': config.getoption('--soak-max-shm-slope'),
+        'latency': config.getoption('--soak-max-latency-slope'),
+    }
+
+
+@pytest.mark.long_runner()
+def test_scale_soak(bench_recorder, bench_trials, mgr, request, stack_pids, setup, cleanup):
+    """
+    Creates and deletes the sub-interfaces and forwarders of --soak-vlans
+    VLANs over and over, for --soak-iterations cycles or --soak-duration
+    seconds, noting the latency of each cycle and the RSS of
+    netopeer2-server and the size of sysrepo's SHM after it. Fails if the
+    trend of any of them, fitted after the --bench-warmup cycles, grows
+    faster than the --soak-max-*-slope limits.
+    """
+    iterations = request.config.getoption('--soak-iterations')
+    duration = request.config.getoption('--soak-duration')
+    if not iterations and not duration:
+        pytest.skip('soak test needs --soak-iterations or --soak-duration')
+    vlan_count = request.config.getoption('--soak-vlans')
+    limits = soak_limits(request.config)
+    pid = stack_pids['netopeer2-server']
+
+    create_configs = [
+        bulk_create_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
+    ]
+    delete_configs = [
+        bulk_delete_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], range(1, vlan_count+1)),
+    ]
+
+    cycles = []
+    deadline = time.monotonic() + duration if duration else None
+    while (not iterations or len(cycles) < iterations) and (deadline is None or time.monotonic() < deadline):
+        with BenchMark(pid=pid, label='create') as create:
+            edit_configs(mgr, create, create_configs)
+        with BenchMark(pid=pid, label='delete') as delete:
+            edit_configs(mgr, delete, delete_configs)
+        cycles.append({
+            'latency': create.elapsed + delete.elapsed,
+            'create': create.elapsed,
+            'delete': delete.elapsed,
+            'rss': process_rss(pid),
+            'shm': shm_usage()[0] / 1024,
+            'error': create.error or delete.error,
+        })
+
+    # slopes per 100 cycles, the latency's relative to its fitted start
+    measured = cycles[bench_trials.warmup:]
+    trends = {}
+    if len(measured) >= 3:
+        for name in ['rss', 'shm', 'latency']:
+            values = [c[name] for c in measured if c[name] is not None]
+            if len(values) >= 3:
+                slope, start = trend(values)
+                if name == 'latency':
+                    slope = slope / start if start > 0 else 0.0
+                trends[name] = {'slope': slope, 'start': start, 'limit': limits[name]}
+
+    errors = [c['error'] for c in cycles if c['error'] is not None]
+    bench_recorder.record_entry(
+        request, 'soak',
+        vlan_count=vlan_count,
+        wall=sum(c['latency'] for c in cycles),
+        operations=2 * len(cycles),
+        repeat=len(cycles),
+        cycles=cycles,
+        trends=trends,
+        error=errors[0] if errors else None,
+    )
+    assert not errors, errors[0]
+    assert len(measured) >= 3, 'too few soak cycles after the warmup to fit a trend'
+    exceeded = [
+        '{} grows by {:.4g} per 100 cycles, limit {:.4g}'.format(name, t['slope'], t['limit'])
+        for name, t in sorted(trends.items())
+        if t['slope'] > t['limit']
+    ]
+    assert not exceeded, '\n'.join(exceeded)
 
 
+def concurrent_session_task(vlanids):
+    """
+    Creates, reads back and deletes the VLANs of one session, interleaving
+    edit-config and get-config
+    """
+    def task(mgr, stats):
+        for vlan in vlanids:
+            stats.timed('create', mgr.edit_config, target='running',
+                        config=create_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], vlan))
+            stats.timed('get-config', get_config_vlan_subinterface, mgr, BaseInterfaces[0], vlan)
+        for vlan in vlanids:
+            stats.timed('delete', mgr.edit_config, target='running',
+                        config=delete_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], vlan))
+    return task
+
+
+@pytest.mark.long_runner()
+@pytest.mark.parametrize('sessions', [1, 2, 4, 8, 16, ])
+def test_scale_concurrent(bench_recorder, mgr, request, setup, cleanup, sessions):
+    """
+    Opens several sessions which edit disjoint VLAN ranges at the same time
+    and records aggregate throughput and per-session latency histograms
+    """
+    load = run_sessions(connect_mgr, [
+        concurrent_session_task(range(i*VlansPerSession + 1, (i+1)*VlansPerSession + 1))
+        for i in range(sessions)
+    ])
+    bench_recorder.record_load(request, 'load', load,
+                               vlan_count=sessions*VlansPerSession)
+    assert not load.errors, '\n'.join(load.errors)
+
+
+@pytest.mark.long_runner()
+def test_scale_event_retention(mgr, setup, cleanup):
+    """The test-service drops its oldest events instead of growing without limit"""
+    log = EventLog()
+    log.clear()
+    start = log.since
+    vlanids = range(1, 1001)
+    create_config = bulk_create_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], vlanids)
+    delete_config = bulk_delete_interfaces_forwarders_single_tagged(BaseInterfaces[0], BaseInterfaces[1], vlanids)
+
+    def cycle():
+        mgr.edit_config(target='running', config=create_config)
+        mgr.edit_config(target='running', config=delete_config)
+
+    cycle()
+    # wait for the last event of the cycle before counting
+    time.sleep(1)
+    events, _ = log.query(since=start)
+    per_cycle = sum(len(event['values']) for event in events)
+    assert per_cycle > 0
+    first, limit = log.retention()
+    for _ in range(limit // per_cycle + 2):
+        if first > start:
+            break
+        cycle()
+        first, limit = log.retention()
+
+    events, _ = log.query(since=start)
+    assert first > start
+    assert events[0]['seq'] == first
+    assert sum(len(event['values']) for event in events) <= max(limit, len(events[-1]['values']))
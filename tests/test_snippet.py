@@ -3,17 +3,12 @@ import glob
 import pytest
 from lxml import etree
 
-from common import xml_to_dict
+from confdiff import config_diff
 
 
-def append_startup_config(expected_config, startup_config):
-    # This test as written does not support the case where containers from
-    # the startup config are also being altered in the snippet config.
-    # (This would require more intelligently merging the containers rather than
-    # the naive update call below.)
-    assert 0 == len([k for k in startup_config.keys() if k in expected_config])
-
-    expected_config.update(startup_config)
+def assert_same_config(left, right):
+    diff = config_diff(left, right)
+    assert not diff, "\n".join(diff)
 
 
 @pytest.mark.parametrize("snippet_file", glob.glob("snippets/*.xml"))
@@ -24,9 +19,9 @@ def test_snippet(mgr, snippet_file):
     performs the cleanup and ensures that the config was entirely removed
     """
 
-    startup_config = xml_to_dict(mgr.get_config(source="startup").data_ele)
-    initial_config = xml_to_dict(mgr.get_config(source="running").data_ele)
-    assert initial_config == startup_config
+    startup_config = mgr.get_config(source="startup").data_ele
+    initial_config = mgr.get_config(source="running").data_ele
+    assert_same_config(initial_config, startup_config)
 
     snippet = etree.parse(snippet_file)
 
@@ -38,16 +33,16 @@ def test_snippet(mgr, snippet_file):
 
         response = snippet.xpath("//response")
         if response:
-            expected_config = xml_to_dict(response[0][0])
-            append_startup_config(expected_config, startup_config)
-            current_config = xml_to_dict(mgr.get_config(source="running").data_ele)
-            assert current_config == expected_config
+            # leaves of the startup config not touched by the snippet are
+            # expected to be unchanged
+            current_config = mgr.get_config(source="running").data_ele
+            assert_same_config(current_config, [response[0][0], startup_config])
 
         cleanup = snippet.xpath("//cleanup")[0][0]
         mgr.edit_config(target="running", config=cleanup)
 
-        final_config = xml_to_dict(mgr.get_config(source="running").data_ele)
-        assert final_config == startup_config
+        final_config = mgr.get_config(source="running").data_ele
+        assert_same_config(final_config, startup_config)
     except:
         if xfail:
             pytest.xfail("Snippet failed, but marked with xfail")
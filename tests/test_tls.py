@@ -9,7 +9,7 @@ import ssl
 from pyasn1_modules import pem
 import pytest
 
-from common import edit_config_dict, wait_for
+from common import edit_config_dict, wait_for, TLS_PORT
 
 SERVER_CA = "pki/server/root-ca/certs/ca.crt"
 SERVER_INTR = "pki/server/intermediate/certs/intermediate.crt"
@@ -324,8 +324,9 @@ def do_cert_test(
     def openssl_connect():
         with open(os.devnull, "r") as n:
             subprocess.check_call(
-                "openssl s_client -connect localhost:6513 -CAfile {ca_certs} -cert {certfile} -key {keyfile} "
+                "openssl s_client -connect localhost:{port} -CAfile {ca_certs} -cert {certfile} -key {keyfile} "
                 "-state -debug -showcerts -verify_return_error -verify 1 2>&1".format(
+                    port=TLS_PORT,
                     keyfile=CLIENT_LEAF_KEY,
                     certfile=CLIENT_LEAF,
                     ca_certs=temp_chains.create(client_ca_certs),
@@ -383,7 +384,7 @@ def setup_tls_config(
                     "ncs:tls": {
                         "ncs:tcp-server-parameters": {
                             "ncs:local-address": "0.0.0.0",
-                            "ncs:local-port": "6513",
+                            "ncs:local-port": str(TLS_PORT),
                         },
                         "ncs:tls-server-parameters": {
                             "ncs:server-identity": {
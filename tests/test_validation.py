@@ -1,7 +1,6 @@
 import pytest
-from lxml import etree
 from ncclient.operations import RPCError
-from common import find_single_xpath, NS_MAP
+from common import find_single_xpath, read_leaf, read_path
 
 
 def test_validation_string_pattern(mgr, cleanup):
@@ -158,12 +157,12 @@ def test_feature_disable_container_list(mgr, cleanup):
 
 
 def test_feature_disabled_and_valid_config(mgr, cleanup):
-    response_xml = mgr.get().data_xml
-    running_config = mgr.get_config(source="running").data_xml
-    assert get_disabled_leaf_from_data_xml(response_xml) == "Not Found"
-    assert get_disabled_leaf_from_data_xml(running_config) == "Not Found"
-    assert get_enabled_leaf_from_data_xml(response_xml) == "Not Found"
-    assert get_enabled_leaf_from_data_xml(running_config) == "Not Found"
+    response = mgr.get().data_ele
+    running_config = mgr.get_config(source="running").data_ele
+    assert get_disabled_leaf_from_data(response) == "Not Found"
+    assert get_disabled_leaf_from_data(running_config) == "Not Found"
+    assert get_enabled_leaf_from_data(response) == "Not Found"
+    assert get_enabled_leaf_from_data(running_config) == "Not Found"
 
     mgr.edit_config(
         target="running",
@@ -200,12 +199,12 @@ def test_feature_disabled_and_valid_config(mgr, cleanup):
         #assert "bad-element" in e.info
         #assert "/test-validation:disabled-elements/disabled-leaf" in e.info
 
-    response_xml = mgr.get().data_xml
-    running_config = mgr.get_config(source="running").data_xml
-    assert get_disabled_leaf_from_data_xml(response_xml) == "Not Found"
-    assert get_disabled_leaf_from_data_xml(running_config) == "Not Found"
-    assert get_enabled_leaf_from_data_xml(response_xml) == "a"
-    assert get_enabled_leaf_from_data_xml(running_config) == "a"
+    response = mgr.get().data_ele
+    running_config = mgr.get_config(source="running").data_ele
+    assert get_disabled_leaf_from_data(response) == "Not Found"
+    assert get_disabled_leaf_from_data(running_config) == "Not Found"
+    assert get_enabled_leaf_from_data(response) == "a"
+    assert get_enabled_leaf_from_data(running_config) == "a"
 
     mgr.edit_config(
         target="running",
@@ -217,12 +216,12 @@ def test_feature_disabled_and_valid_config(mgr, cleanup):
         </config>""",
     )
 
-    response_xml = mgr.get().data_xml
-    running_config = mgr.get_config(source="running").data_xml
-    assert get_disabled_leaf_from_data_xml(response_xml) == "Not Found"
-    assert get_disabled_leaf_from_data_xml(running_config) == "Not Found"
-    assert get_enabled_leaf_from_data_xml(response_xml) == "Not Found"
-    assert get_enabled_leaf_from_data_xml(running_config) == "Not Found"
+    response = mgr.get().data_ele
+    running_config = mgr.get_config(source="running").data_ele
+    assert get_disabled_leaf_from_data(response) == "Not Found"
+    assert get_disabled_leaf_from_data(running_config) == "Not Found"
+    assert get_enabled_leaf_from_data(response) == "Not Found"
+    assert get_enabled_leaf_from_data(running_config) == "Not Found"
 
 
 def test_validation_in_submodule_with_feature(mgr, cleanup):
@@ -290,92 +289,111 @@ def clear_validation_field(mgr, field):
     )
 
 
+# The nodes below depend on features and may not exist in the schema, so
+# the filters select their container or all top level nodes of the module
+DISABLED_ELEMENTS = "test-validation:disabled-elements"
+MODULE_NODES = "test-validation:*"
+
+
 def get_disabled_leaf(mgr):
-    return get_disabled_leaf_from_data_xml(mgr.get().data_xml)
+    return read_leaf(
+        mgr,
+        "test-validation:disabled-elements/test-validation:disabled-leaf",
+        select=DISABLED_ELEMENTS,
+    )
 
 
-def get_disabled_leaf_from_data_xml(data_xml):
+def get_disabled_leaf_from_data(data):
     return find_single_xpath(
-        data_xml,
-        "/nc:data/test-validation:disabled-elements/test-validation:disabled-leaf",
+        data,
+        "test-validation:disabled-elements/test-validation:disabled-leaf",
     )
 
 
 def get_config_disabled_leaf(mgr, datastore="running"):
-    return find_single_xpath(
-        mgr.get_config(source=datastore).data_xml,
-        "/nc:data/test-validation:disabled-elements/test-validation:disabled-leaf",
+    return read_leaf(
+        mgr,
+        "test-validation:disabled-elements/test-validation:disabled-leaf",
+        source=datastore,
+        select=DISABLED_ELEMENTS,
     )
 
 
 def get_enabled_leaf(mgr):
-    return get_enabled_leaf_from_data_xml(mgr.get().data_xml)
+    return read_leaf(
+        mgr,
+        "test-validation:disabled-elements/test-validation:enabled-leaf",
+        select=DISABLED_ELEMENTS,
+    )
 
 
-def get_enabled_leaf_from_data_xml(data_xml):
+def get_enabled_leaf_from_data(data):
     return find_single_xpath(
-        data_xml,
-        "/nc:data/test-validation:disabled-elements/test-validation:enabled-leaf",
+        data,
+        "test-validation:disabled-elements/test-validation:enabled-leaf",
     )
 
 
 def get_config_enabled_leaf(mgr, datastore="running"):
-    return find_single_xpath(
-        mgr.get_config(source=datastore).data_xml,
-        "/nc:data/test-validation:disabled-elements/test-validation:enabled-leaf",
+    return read_leaf(
+        mgr,
+        "test-validation:disabled-elements/test-validation:enabled-leaf",
+        source=datastore,
+        select=DISABLED_ELEMENTS,
     )
 
 
 def get_disabled_list(mgr):
-    data_xml = mgr.get().data_xml
-    doc = etree.fromstring(data_xml.encode("utf-8"))
-    results = doc.xpath(
-        "/nc:data/test-validation:disabled-elements/test-validation:disabled-list",
-        namespaces=NS_MAP,
+    results = read_path(
+        mgr,
+        "test-validation:disabled-elements/test-validation:disabled-list",
+        select=DISABLED_ELEMENTS,
     )
     return results
 
 
 def get_config_disabled_list(mgr, source="running"):
-    data_xml = mgr.get_config(source=source).data_xml
-    doc = etree.fromstring(data_xml.encode("utf-8"))
-    results = doc.xpath(
-        "/nc:data/test-validation:disabled-elements/test-validation:disabled-list",
-        namespaces=NS_MAP,
+    results = read_path(
+        mgr,
+        "test-validation:disabled-elements/test-validation:disabled-list",
+        source=source,
+        select=DISABLED_ELEMENTS,
     )
     return results
 
 
 def get_disabled_container_leaf(mgr):
-    return find_single_xpath(
-        mgr.get().data_xml,
-        "/nc:data/test-validation:disabled-container/test-validation:disabled-container-leaf",
+    return read_leaf(
+        mgr,
+        "test-validation:disabled-container/test-validation:disabled-container-leaf",
+        select=MODULE_NODES,
     )
 
 
 def get_config_disabled_container_leaf(mgr, datastore="running"):
-    return find_single_xpath(
-        mgr.get_config(source=datastore).data_xml,
-        "/nc:data/test-validation:disabled-container/test-validation:disabled-container-leaf",
+    return read_leaf(
+        mgr,
+        "test-validation:disabled-container/test-validation:disabled-container-leaf",
+        source=datastore,
+        select=MODULE_NODES,
     )
 
 
 def get_disabled_container_list(mgr):
-    data_xml = mgr.get().data_xml
-    doc = etree.fromstring(data_xml.encode("utf-8"))
-    results = doc.xpath(
-        "/nc:data/test-validation:disabled-container/test-validation:disabled-container-list",
-        namespaces=NS_MAP,
+    results = read_path(
+        mgr,
+        "test-validation:disabled-container/test-validation:disabled-container-list",
+        select=MODULE_NODES,
     )
     return results
 
 
 def get_config_disabled_container_list(mgr, source="running"):
-    data_xml = mgr.get_config(source=source).data_xml
-    doc = etree.fromstring(data_xml.encode("utf-8"))
-    results = doc.xpath(
-        "/nc:data/test-validation:disabled-container/test-validation:disabled-container-list",
-        namespaces=NS_MAP,
+    results = read_path(
+        mgr,
+        "test-validation:disabled-container/test-validation:disabled-container-list",
+        source=source,
+        select=MODULE_NODES,
     )
     return results
 
@@ -1,7 +1,7 @@
 import pytest
 from lxml import etree
 
-from common import NS_MAP, find_single_xpath
+from common import NS_MAP, find_single_xpath, read_leaf
 from ncclient.operations import RPCError
 
 
@@ -57,24 +57,24 @@ def test_when_statement_becomes_false_error_on_modification(mgr, cleanup):
     assert get_test_container_gated_data(mgr) == 'Not Found'
 
 
-def get_test_container_gated_data_from_data_xml(data_xml):
+def get_test_container_gated_data_from_data(data):
     return find_single_xpath(
-        data_xml,
-        "/nc:data/test-when:test-when/test-when:gated-data",
+        data,
+        "test-when:test-when/test-when:gated-data",
     )
 
-def get_test_container_when_check_from_data_xml(data_xml):
+def get_test_container_when_check_from_data(data):
     return find_single_xpath(
-        data_xml,
-        "/nc:data/test-when:test-when/test-when:when-check",
+        data,
+        "test-when:test-when/test-when:when-check",
     )
 
 
 def get_test_container_gated_data(mgr):
-    return get_test_container_gated_data_from_data_xml(mgr.get().data_xml)
+    return read_leaf(mgr, "test-when:test-when/test-when:gated-data")
 
 def get_test_container_when_check(mgr):
-    return get_test_container_when_check_from_data_xml(mgr.get().data_xml)
+    return read_leaf(mgr, "test-when:test-when/test-when:when-check")
 
 
 def clear_test_container_when_check(mgr, target="running", test_option=None):
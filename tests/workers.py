@@ -0,0 +1,109 @@
+"""
+Isolated Netopeer2 stacks for parallel test workers
+
+When the suite runs under pytest-xdist (`py.test -n 4`) the first worker
+uses the stack started by supervisord. Every other worker copies the
+sysrepo repository, uses its own SHM prefix and starts its own
+netopeer2-server and test-service on the ports given in common.py, so
+tests of different workers never see each other's datastore changes.
+"""
+import glob
+import os
+import shutil
+import subprocess
+
+import event_log
+from common import NETCONF_PORT, TEST_SERVICE_URL
+from readiness import wait_for_file
+
+SYSREPO_REPOSITORY = "/etc/sysrepo"
+WORKER_ROOT = "/tmp/netopeer2-workers"
+
+LISTEN_PORT_XML = """
+<netconf-server xmlns="urn:ietf:params:xml:ns:yang:ietf-netconf-server">
+  <listen>
+    <endpoint>
+      <name>default-ssh</name>
+      <ssh>
+        <tcp-server-parameters>
+          <local-port>{port}</local-port>
+        </tcp-server-parameters>
+      </ssh>
+    </endpoint>
+  </listen>
+</netconf-server>
+"""
+
+
+class WorkerStack:
+    def __init__(self, index):
+        self.name = "gw{}".format(index)
+        self.root = os.path.join(WORKER_ROOT, self.name)
+        self.repository = os.path.join(self.root, "sysrepo")
+        self.pid_file = os.path.join(self.root, "netopeer2-server.pid")
+        # not starting with "sr_", so the files of the default stack (prefix
+        # "sr") can be told apart from those of the workers by their prefix
+        self.shm_prefix = self.name
+        self.processes = []
+        self.pids = {}
+
+    def prepare(self):
+        """
+        Creates the worker's copy of the sysrepo repository and points this
+        process (and the sysrepo tools it runs) to it
+        """
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root)
+        shutil.copytree(SYSREPO_REPOSITORY, self.repository, symlinks=True)
+        self._remove_shm()
+
+        os.environ["SYSREPO_REPOSITORY_PATH"] = self.repository
+        os.environ["SYSREPO_SHM_PREFIX"] = self.shm_prefix
+
+        edit = os.path.join(self.root, "listen-port.xml")
+        with open(edit, "w") as f:
+            f.write(LISTEN_PORT_XML.format(port=NETCONF_PORT))
+        subprocess.check_call(
+            ["sysrepocfg", "-v", "1", "--edit=" + edit, "-f", "xml", "-d", "startup"]
+        )
+
+    def start(self):
+        self._spawn(
+            "netopeer2-server",
+            ["/usr/sbin/netopeer2-server", "-d", "-v", "2", "-t", "180", "-p", self.pid_file],
+        )
+        assert wait_for_file(self.pid_file, timeout=100), "netopeer2-server did not start"
+        self._spawn(
+            "test-service",
+            ["/usr/bin/test-service"],
+            TEST_SERVICE_ADDRESS=TEST_SERVICE_URL.split("://")[1],
+            TEST_SERVICE_EVENT_STREAM=event_log.PATH,
+        )
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.processes = []
+        self.pids = {}
+        self._remove_shm()
+
+    def _spawn(self, name, args, **env):
+        log = open("/var/log/{}-{}.log".format(name, self.name), "w")
+        process = subprocess.Popen(
+            args,
+            env=dict(os.environ, **env),
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        log.close()
+        self.processes.append(process)
+        self.pids[name] = process.pid
+
+    def _remove_shm(self):
+        for path in glob.glob("/dev/shm/{}_*".format(self.shm_prefix)):
+            os.remove(path)
@@ -0,0 +1,166 @@
+"""
+List keys of the YANG modules the tests run against
+
+Configurations are compared per list entry, which needs the key leaves of
+every list, which lists and leaf-lists are ordered by the user and which
+elements are containers. They are read from the YANG sources with a minimal
+statement parser: only module namespaces, containers, lists and leaf-lists
+are of interest, so groupings, augments and deviations are not resolved. A
+list instantiated from a grouping of another module is still found by its
+name as long as all lists of that name use the same keys.
+"""
+import collections
+import functools
+import os
+import re
+
+YANG_DIRS = (
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "yang"),
+    "/etc/sysrepo/yang",
+)
+
+TOKEN = re.compile(
+    r"""
+    \s+ | //[^\n]* | /\*.*?\*/
+    | "(?P<dquoted>(?:[^"\\]|\\.)*)"
+    | '(?P<squoted>[^']*)'
+    | (?P<punct>[{};])
+    | (?P<word>[^\s{};"']+)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+
+ESCAPES = {"n": "\n", "t": "\t", '"': '"', "\\": "\\"}
+
+
+def parse_statements(text):
+    """Parses YANG text into a list of (keyword, argument, substatements)"""
+    statements = []
+    stack = [statements]
+    keyword, args = None, []
+    for match in TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind is None:
+            continue
+        token = match.group(kind)
+        if kind == "punct":
+            if token == "}":
+                stack.pop()
+                continue
+            statement = (keyword, "".join(args), [])
+            stack[-1].append(statement)
+            keyword, args = None, []
+            if token == "{":
+                stack.append(statement[2])
+        elif keyword is None:
+            keyword = token
+        elif kind == "dquoted":
+            args.append(re.sub(r"\\(.)", lambda m: ESCAPES.get(m.group(1), m.group(0)), token))
+        elif token != "+":
+            args.append(token)
+    return statements
+
+
+class ListKeys:
+    """Key leaf names of the YANG lists, looked up by element tag"""
+
+    def __init__(self):
+        self.modules = {}
+        self._keys = {}
+        self._keys_by_name = collections.defaultdict(set)
+        self._leaf_lists = {}
+        self._leaf_lists_by_name = collections.defaultdict(set)
+        self._ordered = set()
+        self._containers = set()
+        self._containers_by_name = set()
+
+    def add_list(self, module, name, keys, ordered=False):
+        self._keys[(module, name)] = keys
+        self._keys_by_name[name].add(keys)
+        if ordered:
+            self._ordered.add((module, name))
+
+    def add_leaf_list(self, module, name, ordered=False):
+        self._leaf_lists[(module, name)] = ordered
+        self._leaf_lists_by_name[name].add(ordered)
+        if ordered:
+            self._ordered.add((module, name))
+
+    def add_container(self, module, name):
+        self._containers.add((module, name))
+        self._containers_by_name.add(name)
+
+    def add_module(self, text):
+        """Adds the lists and containers of one module or submodule"""
+        for keyword, name, substatements in parse_statements(text):
+            if keyword == "module":
+                namespace = _argument(substatements, "namespace")
+                self.modules[namespace] = name
+                self._add_lists(name, substatements)
+            elif keyword == "submodule":
+                self._add_lists(_argument(substatements, "belongs-to"), substatements)
+
+    def _add_lists(self, module, statements):
+        for keyword, name, substatements in statements:
+            ordered = _argument(substatements, "ordered-by") == "user"
+            if keyword == "list":
+                key = _argument(substatements, "key") or ""
+                keys = tuple(k.split(":")[-1] for k in key.split())
+                self.add_list(module, name, keys, ordered)
+            elif keyword == "leaf-list":
+                self.add_leaf_list(module, name, ordered)
+            elif keyword == "container":
+                self.add_container(module, name)
+            self._add_lists(module, substatements)
+
+    def load(self, dirs=YANG_DIRS):
+        """Adds all modules found in dirs and their subdirectories"""
+        for top in dirs:
+            for path, _, files in os.walk(top):
+                for name in sorted(files):
+                    if name.endswith(".yang"):
+                        with open(os.path.join(path, name), encoding="utf-8") as f:
+                            self.add_module(f.read())
+        return self
+
+    def module(self, namespace):
+        """Name of the module with namespace, None if unknown"""
+        return self.modules.get(namespace)
+
+    def keys(self, tag):
+        """
+        Key leaf names of the list with the element tag ({namespace}name),
+        () for lists without keys and None if tag is not a known list
+        """
+        namespace, _, name = tag[1:].rpartition("}")
+        keys = self._keys.get((self.modules.get(namespace), name))
+        if keys is None:
+            candidates = self._keys_by_name.get(name, ())
+            if len(candidates) == 1:
+                keys, = candidates
+        return keys
+
+    def is_container(self, tag):
+        namespace, _, name = tag[1:].rpartition("}")
+        if (self.modules.get(namespace), name) in self._containers:
+            return True
+        return name in self._containers_by_name and name not in self._keys_by_name
+
+    def is_leaf_list(self, tag):
+        namespace, _, name = tag[1:].rpartition("}")
+        if (self.modules.get(namespace), name) in self._leaf_lists:
+            return True
+        return name in self._leaf_lists_by_name and name not in self._keys_by_name
+
+    def ordered_by_user(self, tag):
+        namespace, _, name = tag[1:].rpartition("}")
+        return (self.modules.get(namespace), name) in self._ordered
+
+
+def _argument(statements, keyword):
+    return next((arg for kw, arg, _ in statements if kw == keyword), None)
+
+
+@functools.lru_cache(maxsize=None)
+def load_list_keys(dirs=YANG_DIRS):
+    return ListKeys().load(dirs)